@@ -4,8 +4,8 @@ from __future__ import print_function
 
 __description__ = 'Analyze Cobalt Strike beacon process dumps for further analysis'
 __author__ = 'Didier Stevens'
-__version__ = '0.0.1'
-__date__ = '2021/11/03'
+__version__ = '0.0.2'
+__date__ = '2026/10/18'
 
 """
 Source code put in the public domain by Didier Stevens, no Copyright
@@ -16,6 +16,9 @@ History:
   2021/10/30: start
   2021/11/02: continue
   2021/11/03: continue
+  2026/10/18: 0.0.2 vectorized key counting (numpy optional); added options --keysize and --probablekeys
+  2026/10/18: all probable keys are tried, by searching the encoded sha256 string
+  2026/10/18: added option --jobs
 
 Todo:
   Handle error when memory stream larger than segment?
@@ -39,6 +42,14 @@ import fnmatch
 import json
 import time
 import csv
+import heapq
+import operator
+import multiprocessing
+import mmap
+try:
+    import numpy
+except ImportError:
+    pass
 try:
     from minidump.minidumpfile import MinidumpFile
     from minidump.streams import MemoryInfoListStream
@@ -60,6 +71,12 @@ Manual:
 
 When given Cobalt Strike beacon process dumps as input, this tool will try to locate segments encoded with the 'sleep mask', decoded them and write them to disk as .bin files.
 
+Sleep mask keys are found by counting all the byte sequences with the length of the key (option --keysize, default 13) in a segment: an encoded segment with many null bytes contains the key (and its rotations) many times. Sequences that appear less than 100 times are ignored, and the most frequent sequences that look like a key are reported as probable keys (option --probablekeys, default 10).
+When the numpy module is installed, the sequences are counted with numpy (via a 64-bit hash of each sequence, exact for key sizes up to 8 bytes): this takes seconds in stead of minutes for large segments, but requires about 9 bytes of memory per byte of the segment. For larger key sizes, the sequences that appear at least 100 times are compared byte per byte with the other sequences with the same hash: when 2 different sequences have the same hash, the sequences themselves are counted (this is exact, but much slower). Only the reported number of potential keys can still be too low, when 2 different sequences that appear less than 100 times have the same hash. Without numpy, the sequences are counted with a Python Counter.
+All probable keys are tried: the string sha256\x00 is encoded with each probable key, for each possible key offset, and these encoded strings are searched in the segment. Only when an encoded string is found, is the segment decoded with that key and offset and written to disk. Segments decoded with probable key 0 are written to a file with name filename.baseaddress-offset.bin, segments decoded with other probable keys to filename.baseaddress-keyN-offset.bin.
+
+Option --jobs can be used to analyze segments in parallel, for example --jobs 4 to use 4 processes. The dump file is memory-mapped, and each process reads the segments it analyzes from the memory-mapped file. The results are still reported in order of decreasing segment size. This requires a dump file that is not extracted from an archive and that has no cut-expression: otherwise, the segments are analyzed one after the other.
+
 '''
     for line in manual.split('\n'):
         print(textwrap.fill(line, 79))
@@ -1254,7 +1271,8 @@ def C2SIP3(bytes):
 
 def Xor(data, key, offset):
     key = key[offset:] + key [:offset]
-    return bytes([data[i] ^ key[i % len(key)] for i in range(len(data))])
+    keystream = (key * (len(data) // len(key) + 1))[:len(data)]
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(keystream, 'little')).to_bytes(len(data), 'little')
 
 def KeyStats(data):
     dStats = {}
@@ -1276,7 +1294,192 @@ def NormalizeKey(data):
 def AverageDifferenceConsecutiveBytes(data):
     return CalculateByteStatistics(data=data)[-1]
 
-def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile, options, oParserFlag):
+KEY_MINIMUM_COUNT = 100
+
+# hash of each window of keySize bytes (exact when keySize <= 8)
+def WindowHashes(array, keySize):
+    count = len(array) - keySize + 1
+    hashes = numpy.zeros(count, dtype=numpy.uint64)
+    multiplier = numpy.uint64(IFF(keySize <= 8, 0x100, 0x100000001B3))
+    for index in range(keySize):
+        numpy.multiply(hashes, multiplier, out=hashes)
+        numpy.add(hashes, array[index:index + count], out=hashes, casting='unsafe')
+    return hashes
+
+# each window of keySize bytes as a fixed-width record (exact, but sorting records is much slower than sorting hashes)
+def WindowRecords(array, keySize):
+    count = len(array) - keySize + 1
+    return numpy.ascontiguousarray(numpy.lib.stride_tricks.as_strided(array, shape=(count, keySize), strides=(1, 1))).view('V%d' % keySize).reshape(count)
+
+VERIFY_CHUNK = 0x100000
+
+# True when a window with a candidate hash differs from the first window found with that hash (hashes of windows larger than 8 bytes can collide)
+def CandidateHashesCollide(array, keySize, hashes, candidates):
+    representatives = numpy.full(len(candidates), -1, dtype=numpy.int64)
+    for start in range(0, len(hashes), VERIFY_CHUNK):
+        hashesChunk = hashes[start:start + VERIFY_CHUNK]
+        positions = numpy.flatnonzero(numpy.isin(hashesChunk, candidates))
+        indices = numpy.searchsorted(candidates, hashesChunk[positions])
+        positions += start
+        new = representatives[indices] < 0
+        representatives[indices[new]] = positions[new]
+        positionsRepresentative = representatives[indices]
+        for index in range(keySize):
+            if numpy.any(array[positions + index] != array[positionsRepresentative + index]):
+                return True
+    return False
+
+# returns the number of different keys and a list of [count, rank, key] for keys with count >= minimum
+# rank is the order in which the key is first encountered when scanning the data per offset (the order of the dictionary used in 0.0.1)
+# the keys are counted via their hash (WindowHashes), and via their bytes (WindowRecords) when 2 different keys with count >= minimum have the same hash
+def CountKeysNumpy(data, keySize, minimum, WindowKeys=WindowHashes):
+    array = numpy.frombuffer(data, dtype=numpy.uint8)
+    count = len(array) - keySize + 1
+    if count <= 0:
+        return 0, []
+    hashes = WindowKeys(array, keySize)
+    hashes.sort()
+    numberOfKeys = 1 + int(numpy.count_nonzero(hashes[1:] != hashes[:-1]))
+    if count < minimum:
+        return numberOfKeys, []
+    # in sorted hashes, a hash that appears at least minimum times is equal to the hash minimum - 1 positions further
+    candidates = numpy.unique(hashes[:count - minimum + 1][hashes[minimum - 1:] == hashes[:count - minimum + 1]])
+    counts = numpy.searchsorted(hashes, candidates, 'right') - numpy.searchsorted(hashes, candidates, 'left')
+    del hashes
+    if len(candidates) == 0:
+        return numberOfKeys, []
+
+    hashes = WindowKeys(array, keySize)
+    if WindowKeys == WindowHashes and keySize > 8 and CandidateHashesCollide(array, keySize, hashes, candidates):
+        return CountKeysNumpy(data, keySize, minimum, WindowRecords)
+    dCounts = dict(zip(candidates.tolist(), counts.tolist()))
+    result = []
+    for offset in range(keySize):
+        remaining = numpy.array(list(dCounts.keys()), dtype=hashes.dtype)
+        if len(remaining) == 0:
+            break
+        hashesOffset = hashes[offset::keySize]
+        positions = numpy.flatnonzero(numpy.isin(hashesOffset, remaining))
+        values, indices = numpy.unique(hashesOffset[positions], return_index=True)
+        for value, index in zip(values.tolist(), positions[indices].tolist()):
+            position = offset + index * keySize
+            result.append([dCounts.pop(value), offset * len(data) + position, bytes(data[position:position + keySize])])
+    return numberOfKeys, result
+
+def CountKeysPython(data, keySize, minimum):
+    oCounter = collections.Counter()
+    oMemoryview = memoryview(data)
+    for offset in range(keySize):
+        records = max(0, (len(data) - offset) // keySize)
+        oCounter.update(map(operator.itemgetter(0), struct.iter_unpack('%ds' % keySize, oMemoryview[offset:offset + records * keySize])))
+    return len(oCounter), [[value, rank, key] for rank, (key, value) in enumerate(oCounter.items()) if value >= minimum]
+
+def CountKeys(data, keySize, minimum):
+    if 'numpy' in sys.modules:
+        return CountKeysNumpy(data, keySize, minimum)
+    else:
+        return CountKeysPython(data, keySize, minimum)
+
+# select the most frequent keys that look like a sleep mask key, one per rotation
+def ProbableKeys(candidates, numberOfKeysToTry):
+    heap = [[-count, rank, key] for count, rank, key in candidates]
+    heapq.heapify(heap)
+    keysSorted = []
+    normalizedKeys = set()
+    while heap and len(keysSorted) < numberOfKeysToTry:
+        count, rank, key = heapq.heappop(heap)
+        keyStats = KeyStats(key)
+        acbd = CalculateByteStatistics(data=key)[-1]
+        if keyStats[0][1] < 4 and acbd >= 20:
+            normalizedKey = NormalizeKey(key)
+            if not normalizedKey in normalizedKeys:
+                keysSorted.append([key, -count])
+                normalizedKeys.add(normalizedKey)
+    return keysSorted
+
+SLEEP_MASK_NEEDLE = b'sha256\x00'
+
+# needle encoded with each key, for each phase of the key: {encoded needle: [[key index, phase], ...]}
+def EncodedNeedles(keys, needle):
+    dNeedles = {}
+    for index, key in enumerate(keys):
+        for phase in range(len(key)):
+            encoded = bytes([byte ^ key[(phase + position) % len(key)] for position, byte in enumerate(needle)])
+            dNeedles.setdefault(encoded, []).append([index, phase])
+    return dNeedles
+
+# for each key, the sorted list of offsets for which Xor(data, key, offset) contains needle
+def FindKeyOffsets(data, keys, needle):
+    offsets = [set() for key in keys]
+    for encoded, indexPhases in EncodedNeedles(keys, needle).items():
+        position = data.find(encoded)
+        while position != -1:
+            for index, phase in indexPhases:
+                offsets[index].add((phase - position) % len(keys[index]))
+            position = data.find(encoded, position + 1)
+    return [sorted(item) for item in offsets]
+
+# readable and writable segments: [info, position in dump file, length], sorted by decreasing length
+def SegmentRanges(oMinidumpFile, dataLength):
+    listSegments = []
+    oget_buffered_reader = oMinidumpFile.get_reader().get_buffered_reader()
+    for info in oMinidumpFile.memory_info.infos:
+        if info.Protect == MemoryInfoListStream.AllocationProtect.PAGE_READWRITE:
+#            print(info.Protect, info.BaseAddress, info.RegionSize, info.Type)
+            try:
+                oget_buffered_reader.move(info.BaseAddress)
+            except Exception as e:
+                if e.args[0].endswith(' is not in process memory space'):
+                    print('Error: %s' % e.args[0])
+                    continue
+                else:
+                    raise e
+            oSegment = oget_buffered_reader.current_segment
+            if not oSegment.inrange(info.BaseAddress + info.RegionSize - 1):
+                print('Error: Would read over segment boundaries!')
+                continue
+            position = oSegment.start_file_address + info.BaseAddress - oSegment.start_address
+            listSegments.append([info, position, max(0, min(info.RegionSize, dataLength - position))])
+    return sorted(listSegments, reverse=True, key=lambda item: item[2])
+
+# returns the output lines, decoded segments are written to disk
+def AnalyzeSegment(data, baseAddress, filename, keySize, numberOfKeysToTry):
+    lines = []
+    lines.append('Segment %x size %x' % (baseAddress, len(data)))
+    numberOfKeys, candidates = CountKeys(data, keySize, KEY_MINIMUM_COUNT)
+    lines.append('Potential keys = %d' % numberOfKeys)
+    keysSorted = ProbableKeys(candidates, numberOfKeysToTry)
+
+    if len(keysSorted) > 0:
+        lines.append('Probable keys:')
+        for index, (key, value) in enumerate(keysSorted[:numberOfKeysToTry]):
+            lines.append('%d %d %s %s %f' % (index, value, key, binascii.b2a_hex(key), AverageDifferenceConsecutiveBytes(key)))
+
+        keys = [key for key, value in keysSorted]
+        for keyToTry, offsets in enumerate(FindKeyOffsets(data, keys, SLEEP_MASK_NEEDLE)):
+            lines.append('Trying probable key %d:' % keyToTry)
+            for offset in offsets:
+                lines.append('sha256\\x00 string found, key offset: %d' % offset)
+                dumpFilename = '%s.%x-%s%d.bin' % (filename, baseAddress, IFF(keyToTry == 0, '', 'key%d-' % keyToTry), offset)
+                lines.append('Writing segment to disk: %s' % dumpFilename)
+                with open(dumpFilename, 'wb') as fOut:
+                    fOut.write(Xor(data, keys[keyToTry], offset))
+
+    lines.append('')
+    return lines
+
+# worker for option --jobs: the segment is read from the memory-mapped dump file
+def AnalyzeSegmentMapped(arguments):
+    dumpFilename, position, length, baseAddress, filename, keySize, numberOfKeysToTry = arguments
+    with open(dumpFilename, 'rb') as fIn:
+        oMmap = mmap.mmap(fIn.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            data = oMmap[position:position + length]
+        finally:
+            oMmap.close()
+    return AnalyzeSegment(data, baseAddress, filename, keySize, numberOfKeysToTry)
+
+def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile, options, oParserFlag, oPool=None):
     if content == None:
         try:
             oBinaryFile = cBinaryFile(filename, C2BIP3(options.password), options.noextraction, options.literalfilenames)
@@ -1284,12 +1487,20 @@ def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile,
             oLogfile.LineError('Opening file %s %s' % (filename, repr(sys.exc_info()[1])))
             return
         oLogfile.Line('Success', 'Opening file %s' % filename)
-        try:
-            data = oBinaryFile.read()
-        except:
-            oLogfile.LineError('Reading file %s %s' % (filename, repr(sys.exc_info()[1])))
-            return
-        data = CutData(data, cutexpression)[0]
+        data = None
+        # with option --jobs, regular files (not extracted, without cut-expression) are memory-mapped in stead of read
+        if oPool != None and cutexpression == '' and not oBinaryFile.extracted and oBinaryFile.fIn != sys.stdin and not isinstance(oBinaryFile.fIn, DataIO):
+            try:
+                data = mmap.mmap(oBinaryFile.fIn.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError, mmap.error):
+                data = None
+        if data == None:
+            try:
+                data = oBinaryFile.read()
+            except:
+                oLogfile.LineError('Reading file %s %s' % (filename, repr(sys.exc_info()[1])))
+                return
+            data = CutData(data, cutexpression)[0]
         oBinaryFile.close()
     else:
         data = content
@@ -1301,95 +1512,48 @@ def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile,
         oOutput.Line('File: %s%s' % (filename, IFF(oBinaryFile.extracted, ' (extracted)', '')))
 
 # https://www.elastic.co/blog/detecting-cobalt-strike-with-memory-signatures
-        if b'\x4C\x8B\x53\x08\x45\x8B\x0A\x45\x8B\x5A\x04\x4D\x8D\x52\x08\x45\x85\xC9\x75\x05\x45\x85\xDB\x74\x33\x45\x3B\xCB\x73\xE6\x49\x8B\xF9\x4C\x8B\x03' in data:
+        if data.find(b'\x4C\x8B\x53\x08\x45\x8B\x0A\x45\x8B\x5A\x04\x4D\x8D\x52\x08\x45\x85\xC9\x75\x05\x45\x85\xDB\x74\x33\x45\x3B\xCB\x73\xE6\x49\x8B\xF9\x4C\x8B\x03') != -1:
             oOutput.Line('sleep mask 64-bit 4.2 deobfuscation routine found!')
-        if b'\x8B\x46\x04\x8B\x08\x8B\x50\x04\x83\xC0\x08\x89\x55\x08\x89\x45\x0C\x85\xC9\x75\x04\x85\xD2\x74\x23\x3B\xCA\x73\xE6\x8B\x06\x8D\x3C\x08\x33\xD2' in data:
+        if data.find(b'\x8B\x46\x04\x8B\x08\x8B\x50\x04\x83\xC0\x08\x89\x55\x08\x89\x45\x0C\x85\xC9\x75\x04\x85\xD2\x74\x23\x3B\xCA\x73\xE6\x8B\x06\x8D\x3C\x08\x33\xD2') != -1:
             oOutput.Line('sleep mask 32-bit 4.2 deobfuscation routine found!')
 
 #        listData = [['raw', data]]
 
-        listData = []
-        oMinidumpFile = MinidumpFile.parse_bytes(data)
-        oget_buffered_reader = oMinidumpFile.get_reader().get_buffered_reader()
-        for info in oMinidumpFile.memory_info.infos:
-            if info.Protect == MemoryInfoListStream.AllocationProtect.PAGE_READWRITE:
-#                print(info.Protect, info.BaseAddress, info.RegionSize, info.Type)
-                try:
-                    oget_buffered_reader.move(info.BaseAddress)
-                except Exception as e:
-                    if e.args[0].endswith(' is not in process memory space'):
-                        print('Error: %s' % e.args[0])
-                        continue
-                    else:
-                        raise e
-                try:
-                    bytesSegment = oget_buffered_reader.read(info.RegionSize)
-#                    print(len(bytesSegment))
-                    listData.append([['segment', info], bytesSegment])
-                except OverflowError:
-                    print('OverflowError') #a# handle overflow
-                except Exception as e:
-                    if e.args[0] == 'Would read over segment boundaries!':
-                        print('Error: %s' % e.args[0])
-                    else:
-                        raise e
-        listData = sorted(listData, reverse=True, key=lambda item: len(item[1]))
-
-        numberOfKeysToTry = 10
-        for dataInfo, data in listData:
-            oOutput.Line('Segment %x size %x' % (dataInfo[1].BaseAddress, len(data)))
-            dKeys = {}
-            keySize = 13
-            for offset in range(keySize):
-                position = 0
-                while len(data[position + offset:position + offset + keySize]) == keySize:
-                    key = data[position + offset:position + offset + keySize]
-                    dKeys[key] = dKeys.get(key, 0) + 1
-                    position += keySize
-            oOutput.Line('Potential keys = %d' % len(dKeys))
-            keysSorted = []
-            normalizedKeys = set()
-            for key, value in sorted(dKeys.items(), reverse=True, key=lambda item: item[1]):
-                if value < 100:
-                    continue
-                keyStats = KeyStats(key)
-                acbd = CalculateByteStatistics(data=key)[-1]
-                if keyStats[0][1] < 4 and acbd >= 20:
-                    normalizedKey = NormalizeKey(key)
-                    if not normalizedKey in normalizedKeys:
-                        keysSorted.append([key, value])
-                        normalizedKeys.add(normalizedKey)
-                    if len(keysSorted) >= numberOfKeysToTry:
-                        break
-
-            if len(keysSorted) > 0:
-                oOutput.Line('Probable keys:')
-                for index, (key, value) in enumerate(keysSorted[:numberOfKeysToTry]):
-                    oOutput.Line('%d %d %s %s %f' % (index, value, key, binascii.b2a_hex(key), AverageDifferenceConsecutiveBytes(key)))
-
-                keyToTry = 0
-                oOutput.Line('Trying probable key %d:' % keyToTry)
-                for offset in range(keySize):
-                    decrypted = Xor(data, keysSorted[keyToTry][0], offset)
-                    if b'sha256\x00' in decrypted:
-#                        print(dataInfo[1].Protect, dataInfo[1].BaseAddress, dataInfo[1].RegionSize, dataInfo[1].Type)
-                        oOutput.Line('sha256\\x00 string found, key offset: %d' % offset)
-                        dumpFilename = '%s.%x-%d.bin' % (filename, dataInfo[1].BaseAddress, offset)
-                        oOutput.Line('Writing segment to disk: %s' % dumpFilename)
-                        with open(dumpFilename, 'wb') as fOut:
-                            fOut.write(decrypted)
-
-            oOutput.Line('')
+        if isinstance(data, mmap.mmap):
+            oMinidumpFile = MinidumpFile.parse_buff(data)
+        else:
+            oMinidumpFile = MinidumpFile.parse_bytes(data)
+        listSegments = SegmentRanges(oMinidumpFile, len(data))
+
+        numberOfKeysToTry = options.probablekeys
+        keySize = options.keysize
+        if isinstance(data, mmap.mmap):
+            queue = collections.deque()
+            for info, position, length in listSegments:
+                queue.append(oPool.apply_async(AnalyzeSegmentMapped, [[oBinaryFile.filename, position, length, info.BaseAddress, filename, keySize, numberOfKeysToTry]]))
+                if len(queue) >= 2 * options.jobs:
+                    for line in queue.popleft().get():
+                        oOutput.Line(line)
+            while len(queue) > 0:
+                for line in queue.popleft().get():
+                    oOutput.Line(line)
+        else:
+            for info, position, length in listSegments:
+                for line in AnalyzeSegment(data[position:position + length], info.BaseAddress, filename, keySize, numberOfKeysToTry):
+                    oOutput.Line(line)
 
         # ----------------------------------------------
     except:
         oLogfile.LineError('Processing file %s %s' % (filename, repr(sys.exc_info()[1])))
         if not options.ignoreprocessingerrors:
             raise
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
 
 #    data = CutData(cBinaryFile(filename, C2BIP3(options.password), options.noextraction, options.literalfilenames).Data(), cutexpression)[0]
 
-def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag):
+def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag, oPool=None):
     oOutput = InstantiateCOutput(options)
     index = 0
     if options.jsoninput:
@@ -1404,7 +1568,7 @@ def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag):
         for filename, cutexpression, flag in filenames:
             oOutput.Filename(filename, index, len(filenames))
             index += 1
-            ProcessBinaryFile(filename, None, cutexpression, flag, oOutput, oLogfile, options, oParserFlag)
+            ProcessBinaryFile(filename, None, cutexpression, flag, oOutput, oLogfile, options, oParserFlag, oPool)
 
 def Main():
     moredesc = '''
@@ -1428,6 +1592,9 @@ https://DidierStevens.com'''
     oParser.add_option('--logfile', type=str, default='', help='Create logfile with given keyword')
     oParser.add_option('--logcomment', type=str, default='', help='A string with comments to be included in the log file')
     oParser.add_option('--ignoreprocessingerrors', action='store_true', default=False, help='Ignore errors during file processing')
+    oParser.add_option('--keysize', type=int, default=13, help='Size of the sleep mask key (default 13)')
+    oParser.add_option('--probablekeys', type=int, default=10, help='Number of probable keys to report (default 10)')
+    oParser.add_option('--jobs', type=int, default=1, help='Number of processes to analyze segments (default 1)')
     (options, args) = oParser.parse_args()
 
     if options.man:
@@ -1440,6 +1607,10 @@ https://DidierStevens.com'''
         print('Error: option -j can not be used with files')
         return
 
+    if options.keysize < 1 or options.probablekeys < 1:
+        print('Error: options --keysize and --probablekeys require a positive number')
+        return
+
     oLogfile = cLogfile(options.logfile, options.logcomment)
     oExpandFilenameArguments = cExpandFilenameArguments(args, options.literalfilenames, options.recursedir, options.checkfilenames, '#c#', '#f#')
     oLogfile.Line('FilesCount', str(len(oExpandFilenameArguments.Filenames())))
@@ -1449,7 +1620,15 @@ https://DidierStevens.com'''
         PrintError(oExpandFilenameArguments.message)
         oLogfile.Line('Warning', repr(oExpandFilenameArguments.message))
 
-    ProcessBinaryFiles(oExpandFilenameArguments.Filenames(), oLogfile, options, oParserFlag)
+    oPool = None
+    if options.jobs > 1:
+        oPool = multiprocessing.Pool(options.jobs)
+    try:
+        ProcessBinaryFiles(oExpandFilenameArguments.Filenames(), oLogfile, options, oParserFlag, oPool)
+    finally:
+        if oPool != None:
+            oPool.close()
+            oPool.join()
 
     if oLogfile.errors > 0:
         PrintError('Number of errors: %d' % oLogfile.errors)
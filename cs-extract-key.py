@@ -4,8 +4,8 @@ from __future__ import print_function
 
 __description__ = 'Extract cryptographic keys from Cobalt Strike beacon process dump'
 __author__ = 'Didier Stevens'
-__version__ = '0.0.2'
-__date__ = '2021/11/02'
+__version__ = '0.0.3'
+__date__ = '2026/10/18'
 
 """
 Source code put in the public domain by Didier Stevens, no Copyright
@@ -23,6 +23,12 @@ History:
   2021/10/29: added option -t
   2021/10/31: changes to output
   2021/11/02: man page
+  2026/10/18: 0.0.3 deduplicated key search; added options --mindiversity and --jobs
+  2026/10/18: single block AES test
+  2026/10/18: added option --samples
+  2026/10/18: memory-mapped files; raw key search in the same pass as the AES and HMAC key search
+  2026/10/18: AES and HMAC keys derived from metadata are searched once
+  2026/10/18: added option --minidump
 
 Todo:
   Document flag arguments in man page
@@ -48,11 +54,19 @@ import time
 import csv
 import hashlib
 import hmac
+import multiprocessing
+import mmap
+import bisect
 try:
     import Crypto.Cipher.AES
 except ImportError:
     print('Crypto.Cipher.AES module required: pip install pycryptodome')
     exit(-1)
+try:
+    from minidump.minidumpfile import MinidumpFile
+    from minidump.streams import MemoryInfoListStream
+except ImportError:
+    pass
 if sys.version_info[0] >= 3:
     from io import BytesIO as DataIO
 else:
@@ -111,7 +125,7 @@ Thus the HMAC key and AES key itself are not contained inside the metadata, but
 
 Several fields are found after the raw key, like the computername and username running the beacon. These fields can be used to validate that valid metadata was found. If these fields don't look like expected computernames and usernames, then we are most likely dealing with a false positive, that is best ignored.
 
-After deriving the HMAC and AES key from the raw key, this tool will try to find these 2 keys in process memory. These are the Position: entries found in the output example above. If these HMAC and AES keys are not found inside process memory, then we are also most likely dealing with a false positive.
+After deriving the HMAC and AES key from the raw key, this tool will try to find these 2 keys in process memory. These are the Position: entries found in the output example above. The keys derived from all metadata found in the process memory dump are collected first, and each unique key is searched only once (process memory often contains many copies of the same metadata). If these HMAC and AES keys are not found inside process memory, then we are also most likely dealing with a false positive.
 
 In our experience, detection of metadata as explained above, is only successful with Cobalt Strike version 3.x beacons. And preferably with process memory dumps taken early in the lifespan of a running beacon.
 
@@ -154,6 +168,25 @@ But whenever I found an AES key near an HMAC key, they were always true positive
 
 Remark that the above method (using option -t or -c) works also for version 3.x beacons.
 
+Option --samples FILE tests many encrypted tasks and callbacks with one search: each candidate key is tested with all the samples. The file is a text file with one sample per line: the word task or callback, followed by a space and the encrypted data (hexadecimal, like options -t and -c). Empty lines and lines starting with # are ignored.
+Keys that are found are reported per sample (Sample N: followed by the positions and keys), and at the end, a summary is given with the AES and HMAC key of each sample. The search for the raw key is done once for all samples.
+Example of a samples file:
+# pcap capture.pcapng
+task d12c14aa698a6b85a8ed3c3c33774fe79acadd0e95fa88f45b66d8751682db734472b2c9c874ccc70afa426fb2f510654df7042aa7d2384229518f26d1e044bd
+callback 00000040...
+
+The search for AES and HMAC keys (options -t, -c and --samples) only tests unique candidate keys:
+Process memory dumps contain many identical pages (memory pages filled with the same data). The search is done per page of 4096 bytes: a page (together with the 15 bytes that follow it) that is identical to a page that was searched before, is not searched again. And inside a page, identical 16-byte sequences are tested only once.
+Candidate keys with less than 8 different byte values are not tested (AES and HMAC keys are random: the probability that a random 16-byte key has less than 8 different byte values is smaller than 1 in 1,000,000,000,000). This can be changed with option --mindiversity (--mindiversity 1 tests all candidate keys that are not all 00 bytes).
+The position of a recovered key is reported for each occurrence of the key, including occurrences in pages that were not searched.
+Option --jobs N distributes the search over N processes.
+The raw key is searched during the search for the AES and HMAC keys: as soon as an AES and HMAC key have been found, the SHA256 hash of each candidate key is compared to these keys. The part of the process memory that was searched before these keys were found, is searched again for the raw key only (this only requires the calculation of SHA256 hashes).
+Process memory dump files are not read into memory, but memory-mapped (except for files extracted from ZIP and gzip files, files read from stdin, and files with a cut-expression).
+To test if a candidate key is the AES key, only the first block of the encrypted data is decrypted (the callbackid is in the first block of the decrypted data): the time it takes does not depend on the length of the encrypted data. To test if a candidate key is the HMAC key, the HMAC of all the encrypted data is calculated.
+Each minute, the progress of the search is reported: percentage, number of candidate keys tested per second and estimated time left. At the end of each search, statistics are reported: number of positions (16-byte sequences), number of pages skipped, number of candidate keys tested and candidate keys tested per second.
+
+Option --minidump parses the minidump file (the memory info list and the memory lists) and only searches the memory regions where session keys are stored: committed, private memory with protection PAGE_READWRITE (heap, for example). Code, mapped images and read-only memory are not searched. This option requires the minidump Python module (pip install minidump). The memory regions are searched completely (option -f is not needed), and they are searched in order of likelihood: first the regions that contain string sha256\x00, then the regions closest to this string, then the other regions (largest first). A region in which keys are found is announced with its virtual address, its size and its position in the minidump file, and the statistics of the search (positions searched, pages skipped, candidates tested) are reported once for all regions. Positions of keys are positions in the minidump file.
+
 Beacon process memory can be encoded while the beacon is sleeping. This is done with a configuration option called a sleep mask. Since beacons sleep most of the time, it is very likely that you will take a process dump while a beacon is sleeping. This tool can not recover cryptographic keys from the process memory of a beacon with a sleep mask. I am working on a tool to decode such process memory, and then the output of that tool can be used by this tool.
 
 '''
@@ -164,6 +197,7 @@ DEFAULT_SEPARATOR = ','
 QUOTE = '"'
 
 CS_FIXED_IV = b'abcdefghijklmnop'
+CS_FIXED_IV_CALLBACKID = struct.unpack('>I', CS_FIXED_IV[8:12])[0]
 
 def PrintError(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
@@ -1521,6 +1555,49 @@ def FindAll(data, sub):
         result.append(position)
         start = position + 1
 
+# Searches all byte sequences, each unique byte sequence is searched only once
+# (one search per byte sequence with find is faster than one search with a regular expression with an alternative per byte sequence)
+# Returns a dictionary: byte sequence -> list of positions
+def FindAllMultiple(data, subs):
+    return dict([[sub, FindAll(data, sub)] for sub in set(subs)])
+
+# Returns the raw key of the metadata at the given position
+def MetadataRawKey(data, position):
+    oStruct = cStruct(data[position:position+1000])
+    oStruct.Unpack('>I')
+    datasize = oStruct.Unpack('>I')[0]
+    oStruct.Truncate(datasize)
+    return oStruct.GetBytes(16)
+
+# Option --minidump: returns the file ranges (start, end, virtual address) of the committed, private PAGE_READWRITE memory regions of the minidump
+# Ranges that contain string sha256\x00 come first, followed by the ranges closest to this string, then the larger ranges
+def MinidumpSearchRanges(data, positionsSHA256):
+    if isinstance(data, mmap.mmap):
+        oMinidumpFile = MinidumpFile.parse_buff(data)
+    else:
+        oMinidumpFile = MinidumpFile.parse_bytes(data)
+    segments = []
+    if oMinidumpFile.memory_segments_64 != None:
+        segments.extend(oMinidumpFile.memory_segments_64.memory_segments)
+    if oMinidumpFile.memory_segments != None:
+        segments.extend(oMinidumpFile.memory_segments.memory_segments)
+    ranges = []
+    for info in oMinidumpFile.memory_info.infos:
+        if info.Protect != MemoryInfoListStream.AllocationProtect.PAGE_READWRITE or info.Type != MemoryInfoListStream.MemoryType.MEM_PRIVATE or info.State != MemoryInfoListStream.MemoryState.MEM_COMMIT:
+            continue
+        for segment in segments:
+            start = max(info.BaseAddress, segment.start_virtual_address)
+            end = min(info.BaseAddress + info.RegionSize, segment.end_virtual_address)
+            if start < end:
+                ranges.append([segment.start_file_address + start - segment.start_virtual_address, segment.start_file_address + end - segment.start_virtual_address, start])
+
+    def Distance(item):
+        start, end, address = item
+        distances = [max(start - position, position - end + 1, 0) for position in positionsSHA256]
+        return [min(distances + [len(data)]), start - end]
+
+    return sorted(ranges, key=Distance)
+
 def ExtractEncryptedCallback(data):
     length = struct.unpack('>I', data[:4])[0]
     ciphertext = data[4:4 + length]
@@ -1529,7 +1606,227 @@ def ExtractEncryptedCallback(data):
     else:
         return ciphertext
 
-def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile, options, oParserFlag):
+# Encrypted data (task or callback) for the key search, and the keys that were found for it
+class cSample(object):
+    def __init__(self, name, payload):
+        self.name = name
+        self.encryptedData = payload[:-16]
+        self.hmacSignatureMessage = payload[-16:]
+        self.aeskey = None
+        self.hmackey = None
+        self.hmacaeskey = None
+
+# Returns the payload of a task or callback (hexadecimal), or None
+def ParseSample(sampletype, hexadecimal):
+    try:
+        data = binascii.a2b_hex(hexadecimal)
+    except (binascii.Error, TypeError):
+        return None
+    if sampletype == 'task':
+        payload = data
+    else:
+        payload = ExtractEncryptedCallback(data)
+    if payload == None or len(payload) < 32:
+        return None
+    return payload
+
+# Option --samples: a text file with a sample per line: task or callback, followed by the encrypted data (hexadecimal)
+# Returns the samples and the lines that could not be parsed
+def ParseSamplesFile(filename):
+    samples = []
+    errors = []
+    for line in File2Strings(filename):
+        fields = line.strip().split()
+        if fields == [] or fields[0].startswith('#'):
+            continue
+        payload = None
+        if len(fields) == 2 and fields[0] in ['task', 'callback']:
+            payload = ParseSample(fields[0], fields[1])
+        if payload == None:
+            errors.append(line)
+        else:
+            samples.append(cSample('sample %d %s' % (len(samples) + 1, fields[0]), payload))
+    return samples, errors
+
+KEY_SEARCH_PAGE = 0x1000
+KEY_SEARCH_SHARD = 0x40000
+
+# Yields the position and the unique 16-byte sequences of the shard, that have at least mindiversity different byte values
+def KeyCandidates(shard, offset, count, mindiversity):
+    keys = set()
+    for index in range(count):
+        key = shard[index:index + 16]
+        if key in keys:
+            continue
+        keys.add(key)
+        if len(set(key)) < mindiversity or key == b'\x00' * 16:
+            continue
+        yield offset + index, key
+
+def HMACSHA256(key, data):
+    if hasattr(hmac, 'digest'):
+        return hmac.digest(key, data, 'sha256')
+    else:
+        return hmac.new(key, data, hashlib.sha256).digest()
+
+# The callbackid is in the first block of the decrypted data: with CBC, the first block is the decrypted first block of the encrypted data XOR the IV
+# Only these blocks are decrypted (ECB, the first block of each sample in one call), in stead of all the encrypted data
+# Returns the indices of the samples for which the key is a valid AES key
+def TestAESKey(key, encryptedBlocks):
+    decryptedBlocks = Crypto.Cipher.AES.new(key, Crypto.Cipher.AES.MODE_ECB).decrypt(encryptedBlocks)
+    return [index for index in range(len(encryptedBlocks) // 16) if struct.unpack('>I', decryptedBlocks[index * 16 + 8:index * 16 + 12])[0] ^ CS_FIXED_IV_CALLBACKID < 256]
+
+# Returns the type of key (hmac or aes) and the index of the sample, for each sample for which the key is valid
+# The AES test only depends on the first block of the encrypted data, the HMAC test depends on all the encrypted data (the HMAC key and the AES key are independent keys: each candidate is tested as HMAC key)
+def TestKey(key, samples, encryptedBlocks):
+    result = [['hmac', index] for index, (encryptedData, hmacSignatureMessage) in enumerate(samples) if HMACSHA256(key, encryptedData)[:16] == hmacSignatureMessage]
+    return result + [['aes', index] for index in TestAESKey(key, encryptedBlocks)]
+
+# Executed by the worker processes (option --jobs) or by the main process
+# samples is a list of encrypted data and HMAC signature: each candidate key is tested with all samples
+# rawkeys is a set of AES keys concatenated with HMAC keys: the SHA256 of each candidate key is looked up in this set (raw key)
+# Returns the keys that were found (position, type, key, index of the sample) and the number of candidate keys tested
+def SearchKeysShard(arguments):
+    offset, shard, count, mindiversity, samples, rawkeys = arguments
+    encryptedBlocks = b''.join([encryptedData[:16] for encryptedData, hmacSignatureMessage in samples])
+    found = []
+    tested = 0
+    for position, key in KeyCandidates(shard, offset, count, mindiversity):
+        tested += 1
+        if samples != []:
+            for keytype, index in TestKey(key, samples, encryptedBlocks):
+                found.append([position, keytype, key, index])
+        if rawkeys and hashlib.sha256(key).digest() in rawkeys:
+            found.append([position, 'raw', key, None])
+    return found, tested
+
+# Search for AES, HMAC and raw keys: the state is kept over the searches of different ranges of the same data
+# Pages identical to a page searched before are skipped
+# The raw keys are searched in the same pass as the AES and HMAC keys, with the AES and HMAC keys found so far
+# At the end of a search, the shards searched before the last AES and HMAC keys were found are searched again for raw keys only (SHA256, no AES or HMAC)
+# The positions of the keys found are located once (for all keys found in a search) and cached
+class cKeySearch(object):
+    def __init__(self, data, samples, oPool, oOutput, options):
+        self.data = data
+        self.samples = [[oSample.encryptedData, oSample.hmacSignatureMessage] for oSample in samples]
+        self.oPool = oPool
+        self.oOutput = oOutput
+        self.options = options
+        self.seenPages = set()
+        self.dFound = collections.OrderedDict()
+        self.rawkeys = set()
+        self.shards = []
+        self.dPositions = {}
+
+    # AES keys concatenated with HMAC keys, for each sample
+    def RawKeyDigests(self):
+        dAESKeys = collections.defaultdict(set)
+        dHMACKeys = collections.defaultdict(set)
+        for key, keytypes in self.dFound.items():
+            for keytype, index in keytypes:
+                if keytype == 'aes':
+                    dAESKeys[index].add(key)
+                elif keytype == 'hmac':
+                    dHMACKeys[index].add(key)
+        return set(aeskey + hmackey for index in dAESKeys for aeskey in dAESKeys[index] for hmackey in dHMACKeys[index])
+
+    def ShardArguments(self, shardStart, shardCount, samples, rawkeys):
+        self.shards.append([shardStart, shardCount, rawkeys])
+        return [shardStart, self.data[shardStart:shardStart + shardCount + 15], shardCount, self.options.mindiversity, samples, rawkeys]
+
+    # Splits the positions from start to end in shards
+    # Yields the arguments for SearchKeysShard, the number of positions covered and the number of pages skipped
+    def Shards(self, start, end):
+        shardStart = None
+        shardCount = 0
+        for pageStart in range(start, end, KEY_SEARCH_PAGE):
+            pageCount = min(KEY_SEARCH_PAGE, end - pageStart)
+            digest = hashlib.md5(self.data[pageStart:pageStart + pageCount + 15]).digest()
+            if digest in self.seenPages:
+                if shardStart != None:
+                    yield self.ShardArguments(shardStart, shardCount, self.samples, self.RawKeyDigests()), shardCount, 0
+                    shardStart = None
+                yield None, pageCount, 1
+                continue
+            self.seenPages.add(digest)
+            if shardStart == None:
+                shardStart = pageStart
+                shardCount = 0
+            shardCount += pageCount
+            if shardCount >= KEY_SEARCH_SHARD:
+                yield self.ShardArguments(shardStart, shardCount, self.samples, self.RawKeyDigests()), shardCount, 0
+                shardStart = None
+        if shardStart != None:
+            yield self.ShardArguments(shardStart, shardCount, self.samples, self.RawKeyDigests()), shardCount, 0
+
+    def Collect(self, result, positions, statistics):
+        found, tested = result
+        for position, keytype, key, index in found:
+            if keytype == 'raw':
+                self.rawkeys.add(key)
+            else:
+                self.dFound.setdefault(key, set()).add((keytype, index))
+        statistics['tested'] += tested
+        statistics['positions'] += positions
+
+    def Report(self, statistics, elapsed):
+        self.oOutput.Line('Searched %d positions: %d pages skipped (duplicate), %d candidates tested, %d candidates/s' % (statistics['positions'], statistics['skipped'], statistics['tested'], statistics['tested'] / max(elapsed, 0.001)))
+
+    # Searches the keys at the positions from start to end (with a process pool: at most 2 shards per process are waiting)
+    # When a dictionary of totals is given, the statistics are added to the totals in stead of being reported
+    def Search(self, start, end, totals=None):
+        end = min(end, len(self.data) - 15)
+        if end <= start:
+            return
+        starttime = time.time()
+        progressCounter = 0
+        statistics = {'positions': 0, 'skipped': 0, 'tested': 0}
+        queue = collections.deque()
+        for arguments, positions, skipped in self.Shards(start, end):
+            statistics['skipped'] += skipped
+            if arguments == None:
+                statistics['positions'] += positions
+            elif self.oPool == None:
+                self.Collect(SearchKeysShard(arguments), positions, statistics)
+            else:
+                queue.append([self.oPool.apply_async(SearchKeysShard, [arguments]), positions])
+                if len(queue) >= 2 * self.options.jobs:
+                    asyncResult, positionsQueued = queue.popleft()
+                    self.Collect(asyncResult.get(), positionsQueued, statistics)
+            elapsed = time.time() - starttime
+            if int(elapsed / 60) > progressCounter:
+                progressCounter += 1
+                done = max(statistics['positions'], 1)
+                self.oOutput.Line('Progress: %d%% in %d seconds, %d candidates/s, ETA %d seconds' % (float(done) / float(end - start) * 100.0, int(elapsed), statistics['tested'] / elapsed, elapsed * (end - start - done) / done))
+        while len(queue) > 0:
+            asyncResult, positionsQueued = queue.popleft()
+            self.Collect(asyncResult.get(), positionsQueued, statistics)
+        elapsed = time.time() - starttime
+        if totals == None:
+            self.Report(statistics, elapsed)
+        else:
+            for name in statistics:
+                totals[name] += statistics[name]
+            totals['elapsed'] += elapsed
+
+        rawkeys = self.RawKeyDigests()
+        for shard in self.shards:
+            shardStart, shardCount, rawkeysSearched = shard
+            if not rawkeys <= rawkeysSearched:
+                found = SearchKeysShard([shardStart, self.data[shardStart:shardStart + shardCount + 15], shardCount, self.options.mindiversity, [], rawkeys - rawkeysSearched])[0]
+                self.Collect([found, 0], 0, statistics)
+                shard[2] = rawkeys
+
+        self.dPositions.update(FindAllMultiple(self.data, [key for key in list(self.dFound.keys()) + list(self.rawkeys) if not key in self.dPositions]))
+
+    # Positions of the key from start to end
+    def Positions(self, key, start, end):
+        if not key in self.dPositions:
+            self.dPositions[key] = FindAll(self.data, key)
+        positions = self.dPositions[key]
+        return positions[bisect.bisect_left(positions, start):bisect.bisect_left(positions, end)]
+
+def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile, options, oParserFlag, oPool=None):
     if content == None:
         try:
             oBinaryFile = cBinaryFile(filename, C2BIP3(options.password), options.noextraction, options.literalfilenames)
@@ -1537,12 +1834,20 @@ def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile,
             oLogfile.LineError('Opening file %s %s' % (filename, repr(sys.exc_info()[1])))
             return
         oLogfile.Line('Success', 'Opening file %s' % filename)
-        try:
-            data = oBinaryFile.read()
-        except:
-            oLogfile.LineError('Reading file %s %s' % (filename, repr(sys.exc_info()[1])))
-            return
-        data = CutData(data, cutexpression)[0]
+        data = None
+        # regular files (not extracted, without cut-expression) are memory-mapped in stead of read
+        if cutexpression == '' and not oBinaryFile.extracted and oBinaryFile.fIn != sys.stdin and not isinstance(oBinaryFile.fIn, DataIO):
+            try:
+                data = mmap.mmap(oBinaryFile.fIn.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError, mmap.error):
+                data = None
+        if data == None:
+            try:
+                data = oBinaryFile.read()
+            except:
+                oLogfile.LineError('Reading file %s %s' % (filename, repr(sys.exc_info()[1])))
+                return
+            data = CutData(data, cutexpression)[0]
         oBinaryFile.close()
     else:
         data = content
@@ -1553,17 +1858,34 @@ def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile,
         # ----- Put your data processing code here -----
         oOutput.Line('File: %s%s' % (filename, IFF(oBinaryFile.extracted, ' (extracted)', '')))
 
-        payload = None
+        samples = None
         if options.task != '':
-            payload = binascii.a2b_hex(options.task)
+            samples = [cSample('task', binascii.a2b_hex(options.task))]
         elif options.callback != '':
             encryptedCallbackData = ExtractEncryptedCallback(binascii.a2b_hex(options.callback))
             if encryptedCallbackData == None:
                     oOutput.Line("This doesn't look like callback data (or it is incomplete)")
                     return
-            payload = encryptedCallbackData
-        if payload == None:
-            for position in FindAll(data, b'\x00\x00\xBE\xEF\x00'):
+            samples = [cSample('callback', encryptedCallbackData)]
+        elif options.samples != '':
+            samples, errors = ParseSamplesFile(options.samples)
+            for line in errors:
+                oOutput.Line("This doesn't look like task or callback data (or it is incomplete): %s" % line)
+            if samples == []:
+                return
+        if samples == None:
+            # the keys derived from all the metadata are collected first: each unique key is searched once
+            positionsMetadata = FindAll(data, b'\x00\x00\xBE\xEF\x00')
+            derivedkeys = []
+            for position in positionsMetadata:
+                try:
+                    sha256 = hashlib.sha256(MetadataRawKey(data, position)).digest()
+                except Exception:
+                    # incomplete metadata: the error is reported when the metadata is parsed
+                    continue
+                derivedkeys.extend([sha256[:16], sha256[16:]])
+            dPositions = FindAllMultiple(data, derivedkeys)
+            for position in positionsMetadata:
                 oOutput.Line('Position: 0x%08x' % position)
                 oStruct = cStruct(data[position:position+1000])
                 beef = oStruct.Unpack('>I')[0]
@@ -1596,87 +1918,99 @@ def ProcessBinaryFile(filename, content, cutexpression, flag, oOutput, oLogfile,
                 oOutput.Line('')
 
                 oOutput.Line('AES key:')
-                for position in FindAll(data, binascii.a2b_hex(aeskey)):
+                for position in dPositions[binascii.a2b_hex(aeskey)]:
                     oOutput.Line(' Position: 0x%08x' % position)
 
                 oOutput.Line('')
 
                 oOutput.Line('HMAC key:')
-                for position in FindAll(data, binascii.a2b_hex(hmackey)):
+                for position in dPositions[binascii.a2b_hex(hmackey)]:
                     oOutput.Line(' Position: 0x%08x' % position)
 
                 oOutput.Line('')
 
         else:
             oOutput.Line('Searching for AES and HMAC keys')
-            encryptedCallbackData = payload
-            encryptedData = encryptedCallbackData[:-16]
-            hmacSignatureMessage = encryptedCallbackData[-16:]
-            aeskey = None
-            hmackey = None
-            hmacaeskey = None
+            batch = options.samples != ''
             fullsearch = options.fullsearch
             searchPositions = FindAll(data, b'sha256\x00')
-            if searchPositions == []:
-                fullsearch = True
-            if fullsearch:
-                searchPositions = [0]
-            starttime = time.time()
-            progressCounter = 0
-            for searchPosition in searchPositions:
-                searchRange = len(data)
-                if searchPosition != 0:
-                    oOutput.Line('Searching after sha256\\x00 string (0x%x)' % searchPosition)
-                    searchRange = 0x500000
-                for iter in range(searchRange):
-                    if fullsearch and int((time.time() - starttime) / 60) > progressCounter:
-                        progressCounter += 1
-                        oOutput.Line('Progress: %d%% in %d seconds' % (float(iter) / float(searchRange) * 100.0, int(time.time() - starttime)))
-                    iter = iter + searchPosition
-                    key = data[iter:iter + 16]
-                    if len(key) < 16:
-                        break
-                    if key == b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00':
-                        continue
-                    hmacsSgnatureCalculated = hmac.new(key, encryptedData, hashlib.sha256).digest()[:16]
-                    if hmacSignatureMessage == hmacsSgnatureCalculated:
+            # search ranges: start, end and message
+            if options.minidump:
+                try:
+                    searchRanges = [[start, end, 'Searching PAGE_READWRITE region 0x%x size 0x%x (0x%x)' % (address, end - start, start)] for start, end, address in MinidumpSearchRanges(data, searchPositions)]
+                except Exception as e:
+                    oOutput.Line('Error parsing minidump: %s' % repr(e))
+                    return
+                oOutput.Line('Regions: %d, %d bytes of %d (%.2f%%)' % (len(searchRanges), sum([end - start for start, end, message in searchRanges]), len(data), sum([end - start for start, end, message in searchRanges]) * 100.0 / max(len(data), 1)))
+            else:
+                if searchPositions == []:
+                    fullsearch = True
+                if fullsearch:
+                    searchPositions = [0]
+                searchRanges = []
+                for searchPosition in searchPositions:
+                    if searchPosition == 0:
+                        searchRanges.append([0, len(data), None])
+                    else:
+                        searchRanges.append([searchPosition, searchPosition + 0x500000, 'Searching after sha256\\x00 string (0x%x)' % searchPosition])
+            # keys found in previous searches are reported again when they occur in the searched range
+            oKeySearch = cKeySearch(data, samples, oPool, oOutput, options)
+            # option --minidump: one summary for all regions, a region is only announced when keys are found in it
+            totals = IFF(options.minidump, {'positions': 0, 'skipped': 0, 'tested': 0, 'elapsed': 0.0}, None)
+            for searchPosition, searchEnd, message in searchRanges:
+                searchRange = searchEnd - searchPosition
+                oKeySearch.Search(searchPosition, searchPosition + searchRange, totals)
+                hits = []
+                for key, keytypes in oKeySearch.dFound.items():
+                    for position in oKeySearch.Positions(key, searchPosition, searchPosition + searchRange):
+                        hits.extend([[index, position, keytype == 'aes', key] for keytype, index in keytypes])
+                rawhits = sorted([position, key] for key in oKeySearch.rawkeys for position in oKeySearch.Positions(key, searchPosition, searchPosition + searchRange))
+                if totals != None and hits == [] and rawhits == []:
+                    continue
+                if message != None:
+                    oOutput.Line(message)
+                # with option --samples, the keys are reported per sample
+                indexPrevious = None
+                for index, iter, isAESKey, key in sorted(hits):
+                    oSample = samples[index]
+                    if batch and index != indexPrevious:
+                        oOutput.Line('Sample %d:' % (index + 1))
+                        indexPrevious = index
+                    if not isAESKey:
                         oOutput.Line('HMAC key position: 0x%08x' % iter)
                         oOutput.Line('HMAC Key: %s' % binascii.b2a_hex(key).decode())
-                        hmackey = key
-
-                    cypher = Crypto.Cipher.AES.new(key, Crypto.Cipher.AES.MODE_CBC, CS_FIXED_IV)
-                    decryptedData = cypher.decrypt(encryptedData)
-                    callbackid = struct.unpack('>I', decryptedData[8:12])[0]
-                    if callbackid < 256:
+                        oSample.hmackey = key
+                    else:
                         oOutput.Line('AES key position: 0x%08x' % iter)
                         oOutput.Line('AES Key:  %s' % binascii.b2a_hex(key).decode())
-                        aeskey = key
+                        oSample.aeskey = key
 
-                    if hmackey != None and aeskey != None and hmacaeskey == None:
-                        hmacaeskey = '%s:%s' % (binascii.b2a_hex(hmackey).decode(), binascii.b2a_hex(aeskey).decode())
-                        oOutput.Line('SHA256 raw key: %s' % hmacaeskey)
+                    if oSample.hmackey != None and oSample.aeskey != None and oSample.hmacaeskey == None:
+                        oSample.hmacaeskey = '%s:%s' % (binascii.b2a_hex(oSample.hmackey).decode(), binascii.b2a_hex(oSample.aeskey).decode())
+                        oOutput.Line('SHA256 raw key: %s' % oSample.hmacaeskey)
 
                 oOutput.Line('Searching for raw key')
-                if hmackey != None and aeskey != None:
-                    for iter in range(searchRange):
-                        iter = iter + searchPosition
-                        key = data[iter:iter + 16]
-                        if len(key) < 16:
-                            break
-                        if key == b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00':
-                            continue
-                        sha256 = hashlib.sha256(key).digest()
-                        if aeskey == sha256[:16] and hmackey == sha256[16:]:
-                            oOutput.Line('Raw key position: 0x%08x' % iter)
-                            oOutput.Line('Raw Key:  %s' % binascii.b2a_hex(key).decode())
+                # the raw keys were searched together with the AES and HMAC keys (for all samples)
+                for iter, key in rawhits:
+                    oOutput.Line('Raw key position: 0x%08x' % iter)
+                    oOutput.Line('Raw Key:  %s' % binascii.b2a_hex(key).decode())
+            if totals != None:
+                oKeySearch.Report(totals, totals['elapsed'])
+            if batch:
+                oOutput.Line('Samples:')
+                for oSample in samples:
+                    oOutput.Line(' %s: AES Key: %s HMAC Key: %s' % (oSample.name, IFF(oSample.aeskey == None, 'not found', lambda: binascii.b2a_hex(oSample.aeskey).decode()), IFF(oSample.hmackey == None, 'not found', lambda: binascii.b2a_hex(oSample.hmackey).decode())))
 
         # ----------------------------------------------
     except:
         oLogfile.LineError('Processing file %s %s' % (filename, repr(sys.exc_info()[1])))
         if not options.ignoreprocessingerrors:
             raise
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
 
-def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag):
+def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag, oPool=None):
     oOutput = InstantiateCOutput(options)
     index = 0
     if options.jsoninput:
@@ -1691,7 +2025,7 @@ def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag):
         for filename, cutexpression, flag in filenames:
             oOutput.Filename(filename, index, len(filenames))
             index += 1
-            ProcessBinaryFile(filename, None, cutexpression, flag, oOutput, oLogfile, options, oParserFlag)
+            ProcessBinaryFile(filename, None, cutexpression, flag, oOutput, oLogfile, options, oParserFlag, oPool)
 
 def Main():
     moredesc = '''
@@ -1707,7 +2041,11 @@ https://DidierStevens.com'''
     oParser.add_option('-m', '--man', action='store_true', default=False, help='Print manual')
     oParser.add_option('-t', '--task', type=str, default='', help='Encrypted task data (hexadecimal)')
     oParser.add_option('-c', '--callback', type=str, default='', help='Encrypted callback data (hexadecimal)')
+    oParser.add_option('--samples', type=str, default='', help='Text file with encrypted tasks and callbacks (one per line: task or callback, followed by hexadecimal data)')
+    oParser.add_option('--minidump', action='store_true', default=False, help='Search only the private PAGE_READWRITE memory regions of a minidump file (in combination with options -t, -c and --samples)')
     oParser.add_option('-f', '--fullsearch', action='store_true', default=False, help='Search the complete memory dump (in combination with options -t and -c)')
+    oParser.add_option('--mindiversity', type=int, default=8, help='Minimum number of different byte values of a candidate key (default 8)')
+    oParser.add_option('--jobs', type=int, default=1, help='Number of processes to search for keys (default 1)')
     oParser.add_option('-o', '--output', type=str, default='', help='Output to file (# supported)')
     oParser.add_option('-p', '--password', default='infected', help='The ZIP password to be used (default infected)')
     oParser.add_option('-n', '--noextraction', action='store_true', default=False, help='Do not extract from archive file')
@@ -1730,6 +2068,10 @@ https://DidierStevens.com'''
         print('Error: option -j can not be used with files')
         return
 
+    if options.minidump and not 'minidump' in sys.modules:
+        print('Error: option --minidump requires the minidump Python module: pip install minidump')
+        return
+
     oLogfile = cLogfile(options.logfile, options.logcomment)
     oExpandFilenameArguments = cExpandFilenameArguments(args, options.literalfilenames, options.recursedir, options.checkfilenames, '#c#', '#f#')
     oLogfile.Line('FilesCount', str(len(oExpandFilenameArguments.Filenames())))
@@ -1739,7 +2081,15 @@ https://DidierStevens.com'''
         PrintError(oExpandFilenameArguments.message)
         oLogfile.Line('Warning', repr(oExpandFilenameArguments.message))
 
-    ProcessBinaryFiles(oExpandFilenameArguments.Filenames(), oLogfile, options, oParserFlag)
+    oPool = None
+    if options.jobs > 1:
+        oPool = multiprocessing.Pool(options.jobs)
+    try:
+        ProcessBinaryFiles(oExpandFilenameArguments.Filenames(), oLogfile, options, oParserFlag, oPool)
+    finally:
+        if oPool != None:
+            oPool.close()
+            oPool.join()
 
     if oLogfile.errors > 0:
         PrintError('Number of errors: %d' % oLogfile.errors)
@@ -4,8 +4,8 @@ from __future__ import print_function
 
 __description__ = 'Tool to search for compressed data'
 __author__ = 'Didier Stevens'
-__version__ = '0.0.5'
-__date__ = '2025/06/08'
+__version__ = '0.0.6'
+__date__ = '2026/10/18'
 
 """
 Source code put in the public domain by Didier Stevens, no Copyright
@@ -20,6 +20,16 @@ History:
   2025/04/21: 0.0.3 bugfix YARACompile
   2025/05/25: 0.0.4 added vba, yara predefined rules
   2025/06/08: 0.0.5 added option -u
+  2026/10/18: 0.0.6 exact length zlib carving without copies; added option --maxsize
+  2026/10/18: added options -P and --prefiltercompare
+  2026/10/18: added option --jobs
+  2026/10/18: codecs gzip, xz, lzma, bzip2 and lznt1 for option -t
+  2026/10/18: bytearray VBA decompressor, validated chunk chains
+  2026/10/18: append-only log for option --filenamedatabase; added option --filenamedatabasehash
+  2026/10/18: added options --yaracache and --yarajobs
+  2026/10/18: added option -R; codec vba
+  2026/10/18: added option --hints
+  2026/10/18: added options --checkpoint, --checkpointinterval and --resume
 
 Todo:
   Document flag arguments in man page
@@ -43,6 +53,11 @@ import json
 import time
 import csv
 import zlib
+import heapq
+import copy
+import mmap
+import multiprocessing
+import multiprocessing.pool
 try:
     import pyzipper as zipfile
 except ImportError:
@@ -60,6 +75,14 @@ try:
     import yara
 except ImportError:
     pass
+try:
+    import lzma
+except ImportError:
+    pass
+try:
+    import bz2
+except ImportError:
+    pass
 
 
 def PrintManual():
@@ -72,6 +95,48 @@ If it succeeds, it reports the find (depending on option -n) and moves on to the
 
 Option -n --minsize defines the minimum size of the decompressed data to be included in the report.
 
+Option -t (--type) selects the type of compression: vba (see below) or one or more codecs (comma separated) that are searched for in a single pass: zlib (raw deflate, this is the default), gzip (one or more members), xz, lzma (lzma alone format), bzip2, vba (compressed VBA source code, see below) and lznt1. Value all selects all codecs.
+Each codec has a signature prefilter that determines the candidate positions, and a decoder that determines the exact length of the compressed data. The candidates of all codecs are merged and tried in order of position: when more than one codec has a candidate at the same position, they are tried in this order: gzip, xz, lzma, bzip2, vba, lznt1, zlib. The first codec that succeeds, produces the find.
+After a find, the candidates inside the compressed data are skipped. Codecs gzip, xz, lzma and bzip2 have a magic number as signature: a find of one of these codecs skips the candidates of all codecs, a find of codecs zlib, vba and lznt1 (weak signatures, that produce more false positives) only skips the candidates of the same codec. Thus option -t all finds the same gzip, xz, lzma and bzip2 streams as each of these codecs alone.
+An LZNT1 stream must contain at least one compressed chunk, and each compressed chunk must decompress to more bytes than its size (chains of uncompressed chunks are not reported, they are mostly false positives in random data).
+When more than one codec is selected, a column with the name of the codec is added after the position.
+Example: search-for-compression.py -t gzip,xz,bzip2,zlib memory.dmp
+
+Option -t vba searches for compressed VBA source code (MS-OVBA): a signature byte (0x01) followed by a chain of compressed chunks. First an index is made of all the chunk chains: chunk headers must have signature 3 and the flag compressed set, and chunks must be completely inside the data. Then the chunks are decompressed: chunks with invalid copy tokens (pointing before the start of the chunk) or that decompress to more than 4096 bytes are rejected.
+Option -s with a number followed by c (like -s 1c) selects the compressed data in stead of the decompressed data.
+Codec vba (as part of a list of codecs, like -t zlib,vba) uses the same index and decompressor, but like the other codecs, positions inside a stream that was found are skipped.
+
+Option -R (--recursive) DEPTH searches the decompressed data of each stream again (with the same codecs and options), up to the given depth. Example: VBA code (-t zlib,vba) inside a deflated OOXML part. The result is a tree: nested streams are indented and have an id that starts with the id of the stream they were found in (for example 1.2 is the second stream found inside stream 1). The position of a nested stream is the position inside the decompressed data of its parent.
+Options -s, -j and -y work with nested streams too: -s 1.2 selects nested stream 1.2.
+The results of the search of decompressed data are kept in memory (with the SHA256 of the data as key): when identical data is found again (in the same file or in another file), it is not searched again.
+Option -u only applies to the streams that are not nested.
+
+Option --maxsize limits the size of the decompressed data kept per stream (default 0: no limit). Decompression continues past this limit (without keeping the data) to determine the length of the compressed data. The reported decompressed size is the truncated size.
+The length of the compressed data is exact: it is obtained from the decompression object in a single decompression attempt.
+
+Option -P (--prefilter) selects the positions where decompression is attempted. Candidate positions are determined in a linear pass over the data (regular expressions), before decompression is attempted.
+none: every position is tried (exhaustive search).
+deflate: positions where a raw deflate stream can start: the block type (BTYPE) is valid, and for stored blocks LEN and NLEN are complements, and for dynamic Huffman blocks HLIT and HDIST are in range. This is the default. Positions that are rejected by this prefilter are also rejected by the decompressor, so the results are identical to an exhaustive search.
+header: only positions after a zlib header (CMF/FLG pair that passes the mod-31 check) or a gzip header (magic 1F 8B 08). This prefilter rejects much more positions, but it will not find deflate streams without header.
+
+Option --prefiltercompare performs an exhaustive search and a search with the prefilter selected with option -P, and reports the number of candidate positions, the reduction ratio, the number of streams found (and missed) and the time it took.
+
+Option --hints uses the structure of container formats to find the start of compressed streams. In one pass over the data, these markers are searched:
+PDF: keyword stream of an object with filter /FlateDecode (a zlib stream).
+ZIP (and OOXML, JAR, ...): local file header with compression method 8 (a raw deflate stream).
+PNG: the first IDAT chunk of an image (a zlib stream). Only images with a single IDAT chunk (or a stream that ends inside the first IDAT chunk) decompress completely.
+VBA: a compressed VBA container that starts with Attribut (the source code of VBA modules in OLE files).
+A hint is only used when its codec is selected with option -t (zlib for PDF, ZIP and PNG, vba for VBA).
+--hints first: the hints are tried first. Then the data between the streams that were found via the hints is searched without hints (blind scan). Streams found by the blind scan that overlap a stream found via a hint are dropped. Since the compressed data of well-formed containers is skipped, the blind scan has much less candidate positions to try, and a false positive before a stream can not hide that stream.
+--hints only: only the hints are tried.
+Option --hints is not used in parallel searches (--jobs).
+
+Option --checkpoint FILE stores checkpoints of the search in the given side file: every 60 seconds (option --checkpointinterval) the position of the search, the number of streams and (with option -u) the hashes of the streams are written to this JSON file, together with the list of files that were searched completely. The side file is written to a temporary file that replaces the side file, thus an interruption (crash, Ctrl-C) leaves a valid checkpoint. The side file is removed when all files have been searched.
+Option --resume continues the search from the checkpoint (use the same options and files): files that were searched completely are skipped, and the search of the interrupted file continues at the position of the checkpoint, with the same numbering. With option -o, the output file is truncated to its length at the time of the checkpoint, and the output is appended: the output file is identical to the output file of an uninterrupted search. Without option -o, the output of the resumed search starts with the first stream after the checkpoint (streams reported between the checkpoint and the interruption are reported again).
+Option --checkpoint works with -t zlib (and other codecs), -t vba (checkpoints after each file), -u, -n, -D, -R, -s and -y, but not with options --jobs, --hints, -j, --jsoninput and --yarajobs.
+
+Option --jobs searches a single, large file with more than one process (-t zlib). The file is split in shards that are searched in parallel by the given number of processes: each process memory-maps the file, and a stream that starts inside a shard can end after that shard. The results are merged in order of position. The results are identical to the results of a single process (same streams, same numbering), thus options like -n, -D, -u and -s behave identically. Only regular files (not extracted from ZIP or gzip files, not stdin, without cut-expression) are searched in parallel, and not with option -P header.
+
 Option -u --unique ignores duplicates of decompressed data.
 
 Option -D (--deep) governs the scanning process.
@@ -84,6 +149,10 @@ Otherwise, move on to the next byte.
 
 Option -j (--jsonoutput) produces JSON data containing all decompressed parts.
 
+Option -y (--yara) matches YARA rules with the decompressed data.
+Option --yaracache DIRECTORY stores the compiled YARA rules in the given directory: the filename is the SHA256 hash of the rule sources (and the YARA version). When the same rules are used again, the compiled rules are loaded in stead of compiled. Rule files that are included by other rule files are not part of the hash: clear the directory when included files are changed.
+Option --yarajobs N uses N threads to match the YARA rules with the decompressed data (-t zlib and other codecs): the search continues while the rules are matched. The number of decompressed streams waiting to be matched is limited (2 * N), and results are reported in the same order as with a single thread.
+
 Decompressed data can be selected (-s) and dumped (-a, -A, -x, -X, -b, -B, -d).
 
 
@@ -136,8 +205,10 @@ To prevent the tool from processing file arguments with wildcard characters or s
 
 The content of folders can be processed too: use option --recursedir and provide folder names as argument. Wildcards and here files (for folder names) can be used too.
 
-To keep track of files processed by this tool, use option --filenamedatabase. The value provided with this option, is used to create a JSON file containing all the files (using their filenames) that have already bene processed by this tool.
+To keep track of files processed by this tool, use option --filenamedatabase. The value provided with this option, is used to create a log file (filenamedatabase-VALUE.log) containing all the files that have already bene processed by this tool.
 Use this option to process only new files between subsequent program executions, and make sure that a file is processed only once.
+A record (JSON) is appended to the log file after each processed file: when the tool is interrupted, the next run will resume with the first file that was not processed. A file is considered to be processed when its filename, size and modification time are identical to the record. With option --filenamedatabasehash, the SHA256 hash of the content of the file must also be identical. When the log file contains many outdated records, it is compacted.
+A JSON file of prior versions of this tool (filenamedatabase-VALUE.json) is imported when there is no log file.
 
 File arguments that start with character # have special meaning. These are not processed as actual files on disk (except when option --literalfilenames is used), but as file arguments that specify how to "generate" the file content.
 
@@ -1225,6 +1296,7 @@ class cOutput():
         else:
             self.fileoptions = 'w'
         self.dReplacements = {}
+        self.resumeLength = None
 
     def Replace(self, line):
         for key, value in self.dReplacements.items():
@@ -1244,6 +1316,10 @@ class cOutput():
             if self.ParseHash(self.filenameOption):
                 if not self.separateFiles and self.filename != '':
                     self.fOut = open(self.filename, self.fileoptions)
+            elif self.filenameOption != '' and self.resumeLength != None:
+                # resume: the output written after the checkpoint is discarded
+                self.fOut = open(self.filenameOption, self.fileoptions.replace('w', 'a'))
+                self.fOut.truncate(self.resumeLength)
             elif self.filenameOption != '':
                 self.fOut = open(self.filenameOption, self.fileoptions)
         else:
@@ -1820,7 +1896,9 @@ class cWriteProcessedFile():
                 fOut.write(data)
         return newfilename
 
-def YARACompile(ruledata):
+YARA_EXTERNALS = {'streamname': '', 'VBA': False}
+
+def YARACompile(ruledata, cachedir=''):
     if ruledata.startswith('#'):
         if ruledata.startswith('#h#'):
             rule = binascii.a2b_hex(ruledata[3:]).decode('latin')
@@ -1852,7 +1930,7 @@ rule dir {
             """
         else:
             rule = ruledata[1:]
-        return yara.compile(source=rule, externals={'streamname': '', 'VBA': False}), rule
+        return YARACompileCache(cachedir, rule.encode('utf8'), lambda: yara.compile(source=rule, externals=YARA_EXTERNALS)), rule
     else:
         dFilepaths = {}
         if os.path.isdir(ruledata):
@@ -1863,7 +1941,45 @@ rule dir {
         else:
             for filename in ProcessAt(ruledata):
                 dFilepaths[filename] = filename
-        return yara.compile(filepaths=dFilepaths, externals={'streamname': '', 'VBA': False}), ','.join(dFilepaths.values())
+        source = b''
+        for namespace in sorted(dFilepaths.keys()):
+            with open(dFilepaths[namespace], 'rb') as fRule:
+                source += namespace.encode('utf8') + b'\x00' + fRule.read() + b'\x00'
+        return YARACompileCache(cachedir, source, lambda: yara.compile(filepaths=dFilepaths, externals=YARA_EXTERNALS)), ','.join(dFilepaths.values())
+
+# Compiled rules are stored in directory cachedir (if not empty), with the SHA256 of the YARA version and the rule sources as filename
+# Remark: included rule files are not part of the hash
+def YARACompileCache(cachedir, source, Compile):
+    if cachedir == '':
+        return Compile()
+    key = hashlib.sha256(('%s %s %s\x00' % (getattr(yara, '__version__', ''), getattr(yara, 'YARA_VERSION', ''), repr(sorted(YARA_EXTERNALS.items())))).encode('utf8') + source).hexdigest()
+    filename = os.path.join(cachedir, 'yara-%s.compiled' % key)
+    if os.path.exists(filename):
+        try:
+            return yara.load(filepath=filename)
+        except yara.Error:
+            pass
+    rules = Compile()
+    os.makedirs(cachedir, exist_ok=True)
+    rules.save(filepath=filename + '.tmp')
+    os.replace(filename + '.tmp', filename)
+    return rules
+
+# Matches the YARA rules with the decompressed data (last element of each stream)
+# With a thread pool, streams are matched while carving continues: the number of streams waiting to be matched is limited, results are yielded in order
+def YARAMatchStreams(streams, rules, oYARAPool, jobs):
+    queue = collections.deque()
+    for stream in streams:
+        if oYARAPool == None:
+            yield stream, rules.match(data=stream[-1])
+            continue
+        queue.append([stream, oYARAPool.apply_async(rules.match, [], {'data': stream[-1]})])
+        if len(queue) >= 2 * jobs:
+            stream, oResult = queue.popleft()
+            yield stream, oResult.get()
+    while len(queue) > 0:
+        stream, oResult = queue.popleft()
+        yield stream, oResult.get()
 
 class cMyJSONOutput():
 
@@ -1881,24 +1997,585 @@ class cMyJSONOutput():
     def GetJSON(self):
         return json.dumps({'version': 2, 'id': 'didierstevens.com', 'type': 'content', 'fields': ['id', 'name', 'content'], 'items': self.items})
 
-def ZlibRawDecompress(data):
+CARVE_INPUT_CHUNK = 0x10000
+CARVE_OUTPUT_CHUNK = 0x100000
+CARVE_SHARD_MINIMUM = 0x10000
+DEFLATE_STORED_BLOCK = 0x100000
+
+# Decompresses the deflate stream (raw deflate, zlib or gzip, depending on wbits) at position in data (a memoryview, no copies are made)
+# Returns the decompressed data (truncated to maxsize if maxsize > 0) and the exact length of the compressed stream, determined by the decompression object (eof and unused_data)
+# Returns None, None if there is no complete deflate stream at position
+def ZlibRawDecompress(data, position=0, maxsize=0, wbits=-8):
+    oDecompress = zlib.decompressobj(wbits)
+    decompressed = []
+    size = 0
+    end = position
     try:
-        result = zlib.decompress(data, -8, 1000000)
-        recompressLengthStart = len(zlib.compress(result))
-        if recompressLengthStart <= 1000:
-            recompressLengthStart = 0
+        while not oDecompress.eof and end < len(data):
+            input = data[end:end + CARVE_INPUT_CHUNK]
+            end += len(input)
+            while True:
+                if maxsize > 0:
+                    outputChunk = IFF(size < maxsize, maxsize - size, CARVE_OUTPUT_CHUNK)
+                else:
+                    outputChunk = 0
+                output = oDecompress.decompress(input, outputChunk)
+                if size < maxsize or maxsize <= 0:
+                    decompressed.append(output)
+                size += len(output)
+                input = oDecompress.unconsumed_tail
+                if oDecompress.eof or input == b'' and (outputChunk == 0 or len(output) < outputChunk):
+                    break
+    except zlib.error:
+        return None, None
+    if not oDecompress.eof:
+        return None, None
+    return b''.join(decompressed), end - len(oDecompress.unused_data) - position
+
+# Same as ZlibRawDecompress, for decompression objects of modules lzma and bz2 (needs_input instead of unconsumed_tail)
+def DecompressorDecompress(oDecompressor, data, position, maxsize):
+    decompressed = []
+    size = 0
+    end = position
+    try:
+        while not oDecompressor.eof:
+            if oDecompressor.needs_input:
+                if end >= len(data):
+                    break
+                input = data[end:end + CARVE_INPUT_CHUNK]
+                end += len(input)
+            else:
+                input = b''
+            if maxsize > 0:
+                outputChunk = IFF(size < maxsize, maxsize - size, CARVE_OUTPUT_CHUNK)
+            else:
+                outputChunk = -1
+            output = oDecompressor.decompress(input, outputChunk)
+            if size < maxsize or maxsize <= 0:
+                decompressed.append(output)
+            size += len(output)
+    except Exception:
+        return None, None
+    if not oDecompressor.eof:
+        return None, None
+    return b''.join(decompressed), end - len(oDecompressor.unused_data) - position
+
+# gzip file with one or more members
+def GzipDecompress(data, position, maxsize):
+    decompressed, lenCompressed = ZlibRawDecompress(data, position, maxsize, 31)
+    if decompressed == None:
+        return None, None
+    members = [decompressed]
+    while data[position + lenCompressed:position + lenCompressed + 3] == b'\x1F\x8B\x08':
+        decompressed, lenMember = ZlibRawDecompress(data, position + lenCompressed, maxsize, 31)
+        if decompressed == None:
+            break
+        members.append(decompressed)
+        lenCompressed += lenMember
+    decompressed = b''.join(members)
+    if maxsize > 0:
+        decompressed = decompressed[:maxsize]
+    return decompressed, lenCompressed
+
+def XZDecompress(data, position, maxsize):
+    return DecompressorDecompress(lzma.LZMADecompressor(lzma.FORMAT_XZ), data, position, maxsize)
+
+def LZMADecompress(data, position, maxsize):
+    return DecompressorDecompress(lzma.LZMADecompressor(lzma.FORMAT_ALONE), data, position, maxsize)
+
+def BZip2Decompress(data, position, maxsize):
+    return DecompressorDecompress(bz2.BZ2Decompressor(), data, position, maxsize)
+
+LZNT1_CHUNK_SIZE = 0x1000
+
+# Decompresses the LZNT1 chunk data (without header), returns None if the chunk is invalid
+# MS-OVBA (VBA source code compression) uses the same chunk format
+def LZNT1DecompressChunk(data):
+    decompressed = bytearray()
+    position = 0
+    while position < len(data):
+        flags = data[position]
+        position += 1
+        for bit in range(8):
+            if position >= len(data):
+                break
+            if flags & (1 << bit) == 0:
+                decompressed.append(data[position])
+                position += 1
+            else:
+                if position + 1 >= len(data) or len(decompressed) == 0:
+                    return None
+                copyToken = data[position] + data[position + 1] * 0x100
+                position += 2
+                numberOfOffsetBits = min(max((len(decompressed) - 1).bit_length(), 4), 12)
+                offset = (copyToken >> (16 - numberOfOffsetBits)) + 1
+                length = (copyToken & (0xFFFF >> numberOfOffsetBits)) + 3
+                if offset > len(decompressed):
+                    return None
+                start = len(decompressed) - offset
+                if offset >= length:
+                    decompressed += decompressed[start:start + length]
+                else:
+                    # overlapping copy: the last offset bytes are repeated
+                    decompressed += (decompressed[start:] * (length // offset + 1))[:length]
+    if len(decompressed) > LZNT1_CHUNK_SIZE:
+        return None
+    return decompressed
+
+# LZNT1 stream: chunks (header with signature 3), all chunks except the last one decompress to 4096 bytes
+# The stream must end with a terminator (header 0x0000) or with the end of the data
+# The chain of chunk headers is validated before any chunk is decompressed
+# A compressor only stores a compressed chunk when it is smaller than the decompressed chunk, and a stream must contain at least one compressed chunk
+# (a chain of uncompressed chunks, or a compressed chunk that decompresses to fewer bytes than its size, is almost always a false positive in random data)
+def LZNT1Decompress(data, position, maxsize):
+    chunks = []
+    end = position
+    while end < len(data):
+        if end + 2 > len(data):
+            return None, None
+        header = data[end] + data[end + 1] * 0x100
+        if header == 0:
+            end += 2
+            break
+        size = (header & 0x0FFF) + 3
+        if (header >> 12) & 7 != 3 or end + size > len(data):
+            return None, None
+        chunks.append([end + 2, end + size, header & 0x8000])
+        end += size
+    if not any(flagCompressed for start, stop, flagCompressed in chunks):
+        return None, None
+    decompressed = bytearray()
+    for start, stop, flagCompressed in chunks:
+        if len(decompressed) % LZNT1_CHUNK_SIZE != 0:
+            return None, None
+        if not flagCompressed:
+            decompressedChunk = data[start:stop]
         else:
-            recompressLengthStart = int(recompressLengthStart * 0.95)
-        for iIter in range(recompressLengthStart, len(data)):
-            try:
-                result2 = zlib.decompress(data[:iIter], -8, 1000000)
-                if result == result2:
-                    return result, iIter, data[iIter:]
-            except:
-                pass
-        return result, -1, ''
-    except:
-        return None, None, None
+            decompressedChunk = LZNT1DecompressChunk(data[start:stop])
+            if decompressedChunk == None or len(decompressedChunk) <= stop - start:
+                return None, None
+        if maxsize <= 0 or len(decompressed) < maxsize:
+            decompressed += decompressedChunk
+        else:
+            decompressed += bytes(len(decompressedChunk))
+    if len(decompressed) == 0:
+        return None, None
+    if maxsize > 0:
+        decompressed = decompressed[:maxsize]
+    return bytes(decompressed), end - position
+
+# Compressed VBA source code (MS-OVBA): signature byte 01 followed by compressed chunks (header with signature 3 and flag compressed set)
+oREVBA = re.compile(b'\x01(?=.[\xB0-\xBF])', re.DOTALL)
+
+# Returns the chunks (start and end of the chunk data) of the compressed container at position, and the end of the container
+# Only chunks that are completely inside the data are part of the chain
+def VBAChunkChain(data, position):
+    chunks = []
+    positionChunk = position + 1
+    while positionChunk + 1 < len(data) and data[positionChunk + 1] & 0xF0 == 0xB0:
+        sizeCompressedChunk = (struct.unpack('<H', data[positionChunk:positionChunk + 2])[0] & 0x0FFF) + 3
+        if positionChunk + sizeCompressedChunk > len(data):
+            break
+        chunks.append([positionChunk + 2, positionChunk + sizeCompressedChunk])
+        positionChunk += sizeCompressedChunk
+    return chunks, positionChunk
+
+# Index of potential compressed containers: the chunk chains are validated before decompression
+def VBAIndex(data):
+    index = []
+    for oMatch in oREVBA.finditer(data):
+        chunks, end = VBAChunkChain(data, oMatch.start())
+        if chunks != []:
+            index.append([oMatch.start(), chunks, end])
+    return index
+
+def VBADecompress(data, chunks):
+    decompressed = bytearray()
+    for start, end in chunks:
+        decompressedChunk = LZNT1DecompressChunk(data[start:end])
+        if decompressedChunk == None:
+            return None
+        decompressed += decompressedChunk
+    return bytes(decompressed)
+
+def VBACodecDecompress(data, position, maxsize):
+    chunks, end = VBAChunkChain(data, position)
+    if chunks == []:
+        return None, None
+    decompressed = VBADecompress(data, chunks)
+    if decompressed == None:
+        return None, None
+    if maxsize > 0:
+        decompressed = decompressed[:maxsize]
+    return decompressed, end - position
+
+# A codec has a signature prefilter (returns the sorted candidate positions from start to end) and a decoder (returns the decompressed data and the exact length of the compressed data)
+# magic: the signature is a magic number (a stream of such a codec can contain candidates of other codecs, but is seldom a false positive)
+class cCodec(object):
+    def __init__(self, name, Candidates, Decompress, module=None, magic=False):
+        self.name = name
+        self.Candidates = Candidates
+        self.Decompress = Decompress
+        self.module = module
+        self.magic = magic
+
+# Yields the positions from start to end where regular expression oRegex (a lookahead) matches
+def RegexCandidates(oRegex, data, start, end):
+    for oMatch in oRegex.finditer(data, start):
+        if oMatch.start() >= end:
+            break
+        yield oMatch.start()
+
+def ByteClass(condition):
+    return b'[' + b''.join([re.escape(bytes([value])) for value in range(256) if condition(value)]) + b']'
+
+# First byte of a raw deflate stream: bit 0 is BFINAL, bits 1 and 2 are BTYPE (0 stored, 1 fixed Huffman, 2 dynamic Huffman, 3 invalid)
+# Dynamic Huffman: HLIT (5 bits) and HDIST (5 bits) can not exceed 29, HCLEN (4 bits) is always valid
+# Stored: the first byte is followed by LEN and NLEN (16-bit), NLEN is the one's complement of LEN
+oREDeflateHuffman = re.compile(b'(?=' + ByteClass(lambda value: (value >> 1) & 3 == 1) + b'.|' + ByteClass(lambda value: (value >> 1) & 3 == 2 and value >> 3 <= 29) + ByteClass(lambda value: value & 0x1F <= 29) + b')', re.DOTALL)
+oREDeflateStored = ByteClass(lambda value: (value >> 1) & 3 == 0)
+
+# zlib header: CMF (CM 8, CINFO <= 7) and FLG with FDICT not set, CMF * 256 + FLG is a multiple of 31
+# gzip header: magic 1F 8B and CM 8
+oREZlibHeader = re.compile(b'(?=' + b'|'.join([re.escape(bytes([cmf, flg])) for cmf in range(8, 0x80, 0x10) for flg in range(256) if (cmf * 256 + flg) % 31 == 0 and flg & 0x20 == 0]) + b')')
+oREGzipHeader = re.compile(b'(?=\x1F\x8B\x08)')
+# xz: magic FD 37 7A 58 5A 00
+oREXZHeader = re.compile(b'(?=\xFD7zXZ\x00)')
+# lzma (alone): properties 5D, dictionary size (32-bit, at least 64KB) and uncompressed size (64-bit, unknown (all FF) or smaller than 2^40)
+oRELZMAHeader = re.compile(b'(?=\x5D\x00\x00(?:[\x01-\xFF][\x00-\x60]|\x00[\x01-\x60])(?:\xFF{8}|.{5}\x00\x00\x00))', re.DOTALL)
+# bzip2: magic BZh, block size 1-9 and block header 1AY&SY (pi) or end of stream (sqrt(pi))
+oREBZip2Header = re.compile(b'(?=BZh[1-9](?:1AY&SY|\x17rE8P\x90))')
+# LZNT1: header of a compressed chunk (signature 3, first token is a literal) or an uncompressed chunk of 4096 bytes
+oRELZNT1Header = re.compile(b'(?=.[\xB0-\xBF]' + ByteClass(lambda value: value & 1 == 0) + b'|\xFF\x3F)', re.DOTALL)
+
+# The range is processed in blocks of DEFLATE_STORED_BLOCK positions (plus the 4 bytes of LEN and NLEN of the last position), to limit memory usage
+def DeflateStoredCandidates(data, start, end):
+    oREStored = re.compile(oREDeflateStored)
+    for blockStart in range(start, end, DEFLATE_STORED_BLOCK):
+        blockEnd = min(blockStart + DEFLATE_STORED_BLOCK, end)
+        block = data[blockStart:blockEnd + 4]
+        if len(block) < 5:
+            return
+        # byte i of xored is block[i + 1] ^ block[i + 3]: LEN and NLEN are complements where 2 consecutive bytes are FF
+        xored = (int.from_bytes(block[1:-2], 'little') ^ int.from_bytes(block[3:], 'little')).to_bytes(len(block) - 3, 'little')
+        for oMatch in re.finditer(b'(?=\xFF\xFF)', xored):
+            if oMatch.start() < blockEnd - blockStart and oREStored.match(block, oMatch.start()):
+                yield blockStart + oMatch.start()
+
+def GzipHeaderLength(data, position):
+    flags = P23Ord(data[position + 3])
+    if flags & 0xE0 != 0:
+        return None
+    length = 10
+    if flags & 0x04:
+        if position + length + 2 > len(data):
+            return None
+        length += 2 + struct.unpack('<H', data[position + length:position + length + 2])[0]
+    for flag in [0x08, 0x10]:
+        if flags & flag:
+            end = data.find(b'\x00', position + length)
+            if end == -1:
+                return None
+            length = end - position + 1
+    if flags & 0x02:
+        length += 2
+    if position + length >= len(data):
+        return None
+    return length
+
+def HeaderCandidates(data):
+    for oMatch in oREZlibHeader.finditer(data):
+        yield oMatch.start() + 2
+    for oMatch in oREGzipHeader.finditer(data):
+        length = GzipHeaderLength(data, oMatch.start())
+        if length != None:
+            yield oMatch.start() + length
+
+# Returns the sorted candidate positions (without duplicates) for the given prefilter
+# Prefilters none and deflate can be restricted to the positions from start to end
+def ZlibCandidates(data, prefilter, start=0, end=None):
+    if end == None:
+        end = len(data)
+    if prefilter == 'none':
+        return range(start, end)
+    elif prefilter == 'deflate':
+        iterators = [RegexCandidates(oREDeflateHuffman, data, start, end), DeflateStoredCandidates(data, start, end)]
+    else:
+        iterators = [sorted(HeaderCandidates(data))]
+    return Unique(heapq.merge(*iterators))
+
+def Unique(iterator):
+    previous = None
+    for item in iterator:
+        if item != previous:
+            yield item
+        previous = item
+
+# Registry of codecs: when candidates of different codecs have the same position, they are tried in this order
+CODECS = [
+    cCodec('gzip', lambda data, options, start, end: RegexCandidates(oREGzipHeader, data, start, end), GzipDecompress, magic=True),
+    cCodec('xz', lambda data, options, start, end: RegexCandidates(oREXZHeader, data, start, end), XZDecompress, 'lzma', True),
+    cCodec('lzma', lambda data, options, start, end: RegexCandidates(oRELZMAHeader, data, start, end), LZMADecompress, 'lzma', True),
+    cCodec('bzip2', lambda data, options, start, end: RegexCandidates(oREBZip2Header, data, start, end), BZip2Decompress, 'bz2', True),
+    cCodec('vba', lambda data, options, start, end: RegexCandidates(oREVBA, data, start, end), VBACodecDecompress),
+    cCodec('lznt1', lambda data, options, start, end: RegexCandidates(oRELZNT1Header, data, start, end), LZNT1Decompress),
+    cCodec('zlib', lambda data, options, start, end: ZlibCandidates(data, options.prefilter, start, end), ZlibRawDecompress),
+]
+
+def CodecNames():
+    return [oCodec.name for oCodec in CODECS]
+
+# Option -t: a comma separated list of codecs, or all
+def GetCodecs(options):
+    if options.type == 'all':
+        return CODECS
+    names = options.type.split(',')
+    return [oCodec for oCodec in CODECS if oCodec.name in names]
+
+def TagCandidates(candidates, index):
+    for candidate in candidates:
+        yield candidate, index
+
+# Merges the candidates of all codecs: sorted on position, then on the order of the codecs
+def CarveCandidates(data, codecs, options, start=0, end=None):
+    if end == None:
+        end = len(data)
+    return heapq.merge(*[TagCandidates(oCodec.Candidates(data, options, start, end), index) for index, oCodec in enumerate(codecs)])
+
+# Skip positions (one per codec): candidates of a codec before its skip position are not tried
+# After a find of a codec with a magic signature, the candidates of all codecs inside the compressed data are skipped, after a find of another codec only the candidates of the same codec
+# Thus a false positive of a codec with a weak signature (zlib, lznt1, vba) does not hide streams of codecs with a magic signature
+def CarveSkip(positions, codecs, index, position):
+    if codecs[index].magic:
+        for indexCodec in range(len(positions)):
+            positions[indexCodec] = max(positions[indexCodec], position)
+    else:
+        positions[index] = max(positions[index], position)
+
+# Walks the candidate positions (sorted) and yields position, codec name, decompressed data and length of the compressed data for each stream that is found
+# After a find, candidates inside the compressed data are skipped (depending on option -D and on the codec, see CarveSkip), and the candidates of the other codecs at the same position
+# The skip positions (positions) are updated in place, they start at 0 when they are not given
+# With a checkpoint, the search starts at the position of the checkpoint and the position is reported before each decompression attempt
+# The memoryview is released when the generator ends (also with an exception or when the generator is closed), so that a memory-mapped file can be closed
+def Carve(data, codecs, candidates, options, oCheckpoint=None, positions=None):
+    oMemoryview = memoryview(data)
+    if positions == None:
+        positions = [0] * len(codecs)
+    if oCheckpoint != None:
+        positions[:] = [max(position, oCheckpoint.position) for position in IFF(oCheckpoint.positions == None, positions, oCheckpoint.positions)]
+    found = None
+    try:
+        for candidate, index in candidates:
+            if candidate < positions[index] or candidate == found:
+                continue
+            if oCheckpoint != None:
+                oCheckpoint.Progress(candidate, positions)
+            decompressed, lenCompressed = codecs[index].Decompress(oMemoryview, candidate, options.maxsize)
+            if decompressed != None and len(decompressed) >= options.minsize:
+                yield candidate, codecs[index].name, decompressed, lenCompressed
+                found = candidate
+                CarveSkip(positions, codecs, index, candidate + CarveAdvance(lenCompressed, options))
+    finally:
+        oMemoryview.release()
+
+# A memory-mapped file can not be closed while a memoryview of it exists (a generator suspended by an exception that is being handled): then it is closed when it is garbage collected
+def CloseMmap(oMmap):
+    try:
+        oMmap.close()
+    except BufferError:
+        pass
+
+# Hints for option --hints: structure markers of container formats that point to the start of a compressed stream
+# PDF: stream keyword (the dictionary contains /FlateDecode), the zlib header is skipped
+# ZIP (OOXML, JAR, ...): local file header with compression method 8 (deflate)
+# PNG: IDAT chunk that starts with a zlib header (the first chunk of a run of IDAT chunks)
+# VBA: compressed container with a first chunk that starts with literal Attribut (OLE module streams)
+oREHints = re.compile(b'(?P<pdf>(?<!end)stream\r?\n)|(?P<zip>PK\x03\x04)|(?P<png>IDAT)|(?P<vba>\x01(?=.[\xB0-\xBF]\x00Attribut))', re.DOTALL)
+
+def IsZlibHeader(data, position):
+    return position + 2 <= len(data) and P23Ord(data[position]) & 0x8F == 8 and P23Ord(data[position + 1]) & 0x20 == 0 and (P23Ord(data[position]) * 256 + P23Ord(data[position + 1])) % 31 == 0
+
+# Yields position and codec name of the hints, in one pass over the data
+def Hints(data):
+    for oMatch in oREHints.finditer(data):
+        format = oMatch.lastgroup
+        position = oMatch.start()
+        if format == 'pdf':
+            dictionary = data[max(0, position - 0x400):position]
+            index = dictionary.rfind(b'endstream')
+            if index != -1:
+                dictionary = dictionary[index:]
+            if b'/FlateDecode' in dictionary and IsZlibHeader(data, oMatch.end()):
+                yield oMatch.end() + 2, 'zlib'
+        elif format == 'zip':
+            if position + 30 > len(data):
+                continue
+            method = struct.unpack('<H', data[position + 8:position + 10])[0]
+            namelength, extralength = struct.unpack('<HH', data[position + 26:position + 30])
+            if method == 8:
+                yield position + 30 + namelength + extralength, 'zlib'
+        elif format == 'png':
+            if IsZlibHeader(data, position + 4):
+                yield position + 6, 'zlib'
+        else:
+            yield position, 'vba'
+
+# Sorted candidates (position, codec index) of the hints for the selected codecs
+def HintCandidates(data, codecs):
+    dIndices = dict([[oCodec.name, index] for index, oCodec in enumerate(codecs)])
+    return sorted(set((position, dIndices[name]) for position, name in Hints(data) if name in dIndices and position < len(data)))
+
+# Option --hints only: only the hints are carved
+# Option --hints first: the hints are carved first, then the data between the streams found via the hints is carved without hints
+# A stream found without hints that overlaps a stream found via the hints is dropped
+def CarveHints(data, codecs, options):
+    streams = list(Carve(data, codecs, HintCandidates(data, codecs), options))
+    if options.hints == 'only':
+        for stream in streams:
+            yield stream
+        return
+    start = 0
+    for stream in streams + [None]:
+        if stream == None:
+            end = len(data)
+        else:
+            end = stream[0]
+        for result in Carve(data, codecs, CarveCandidates(data, codecs, options, start, end), options):
+            if result[0] + result[3] <= end:
+                yield result
+        if stream != None:
+            yield stream
+            start = max(start, stream[0] + stream[3])
+
+def CarveData(data, codecs, options):
+    if options.hints != '':
+        return CarveHints(data, codecs, options)
+    else:
+        return Carve(data, codecs, CarveCandidates(data, codecs, options), options)
+
+# Numbers the streams, duplicates are skipped with option -u
+def CarveSelect(oCarve, options, oCheckpoint=None):
+    hashes = set()
+    counter = 0
+    if oCheckpoint != None:
+        hashes = oCheckpoint.hashes
+        counter = oCheckpoint.counter
+    for position, name, decompressed, lenCompressed in oCarve:
+        sha256 = hashlib.sha256(decompressed).hexdigest()
+        if options.unique and sha256 in hashes:
+            continue
+        hashes.add(sha256)
+        counter += 1
+        if oCheckpoint != None:
+            oCheckpoint.counter = counter
+        yield counter, position, name, lenCompressed, decompressed
+
+# Memo for option --recursive: SHA256 of data -> streams found in the data (position, codec name, length of compressed data)
+dRecursiveMemo = {}
+
+# Yields the streams (with an id and a depth) and with option --recursive the streams found inside the decompressed data of each stream (depth first)
+def CarveRecursive(streams, codecs, options):
+    for counter, position, name, lenCompressed, decompressed in streams:
+        yield counter, 0, position, name, lenCompressed, decompressed
+        for stream in CarveNested(decompressed, str(counter), 1, codecs, options):
+            yield stream
+
+# Data that was searched before (identical SHA256) is not searched again: the streams are decompressed with the positions in the memo
+def CarveNested(data, parentId, depth, codecs, options):
+    if depth > options.recursive:
+        return
+    sha256 = hashlib.sha256(data).hexdigest()
+    if not sha256 in dRecursiveMemo:
+        dRecursiveMemo[sha256] = [[position, name, lenCompressed] for position, name, decompressed, lenCompressed in CarveData(data, codecs, options)]
+    dCodecs = dict([[oCodec.name, oCodec] for oCodec in codecs])
+    oMemoryview = memoryview(data)
+    for index, (position, name, lenCompressed) in enumerate(dRecursiveMemo[sha256]):
+        decompressed = dCodecs[name].Decompress(oMemoryview, position, options.maxsize)[0]
+        id = '%s.%d' % (parentId, index + 1)
+        yield id, depth, position, name, lenCompressed, decompressed
+        for stream in CarveNested(decompressed, id, depth + 1, codecs, options):
+            yield stream
+
+def CarveAdvance(lenCompressed, options):
+    if options.deep == 0 or lenCompressed >= options.deep:
+        return lenCompressed
+    else:
+        return 1
+
+dMmapsWorker = {}
+
+# Executed by the worker processes: each worker memory-maps the file once
+def CarveShard(arguments):
+    filename, start, end, options = arguments
+    if not filename in dMmapsWorker:
+        for oMmap in dMmapsWorker.values():
+            CloseMmap(oMmap)
+        dMmapsWorker.clear()
+        with open(filename, 'rb') as fIn:
+            dMmapsWorker[filename] = mmap.mmap(fIn.fileno(), 0, access=mmap.ACCESS_READ)
+    codecs = GetCodecs(options)
+    return list(Carve(dMmapsWorker[filename], codecs, CarveCandidates(dMmapsWorker[filename], codecs, options, start, end), options))
+
+def CarveShards(filename, size, oPool, options):
+    shardsize = max(CARVE_SHARD_MINIMUM, size // (options.jobs * 8) + 1)
+    queue = collections.deque()
+    for start in range(0, size, shardsize):
+        queue.append([start, min(start + shardsize, size), oPool.apply_async(CarveShard, [[filename, start, min(start + shardsize, size), options]])])
+        if len(queue) >= 2 * options.jobs:
+            start, end, oResult = queue.popleft()
+            yield start, end, oResult.get()
+    while len(queue) > 0:
+        start, end, oResult = queue.popleft()
+        yield start, end, oResult.get()
+
+# Skip positions (see CarveSkip) at position of a search that started at position without finds before position, after the given finds that start before position
+def CarveSkipPositions(codecs, results, position, options):
+    dIndices = dict([[oCodec.name, index] for index, oCodec in enumerate(codecs)])
+    positions = [position] * len(codecs)
+    for candidate, name, decompressed, lenCompressed in results:
+        if candidate >= position:
+            break
+        CarveSkip(positions, codecs, dIndices[name], candidate + CarveAdvance(lenCompressed, options))
+    return positions
+
+# The shards of the file are carved by the process pool (a stream starting inside a shard can end after the shard) and the results are merged in order of position
+# A worker starts carving at the start of its shard with skip positions at the start of the shard: from a position where the skip positions of the worker and of the serial search are the same, the results of the worker are the results of the serial search
+# Until that position (because of streams that started in a previous shard, or streams found by the worker that are skipped by the serial search), the shard is carved here
+# Thus the results are identical to the results of a serial search (Carve)
+def CarveParallel(filename, data, codecs, oPool, options):
+    dIndices = dict([[oCodec.name, index] for index, oCodec in enumerate(codecs)])
+    positions = [0] * len(codecs)
+    for start, end, results in CarveShards(filename, len(data), oPool, options):
+        position = start
+        while position < end:
+            positionsWorker = CarveSkipPositions(codecs, results, position, options)
+            positionsSerial = [max(positionSerial, position) for positionSerial in positions]
+            if positionsSerial == positionsWorker:
+                for result in results:
+                    if result[0] >= position:
+                        yield result
+                        CarveSkip(positions, codecs, dIndices[result[1]], result[0] + CarveAdvance(result[3], options))
+                break
+            positionCarved = min(max(positionsSerial + positionsWorker), end)
+            for result in Carve(data, codecs, CarveCandidates(data, codecs, options, position, positionCarved), options, positions=positions):
+                yield result
+            position = positionCarved
+
+# Option -P applies to the zlib codec, the other codecs use their signature prefilter in both searches
+def PrefilterCompare(data, codecs, oOutput, options):
+    results = {}
+    for prefilter in ['none', options.prefilter]:
+        optionsPrefilter = copy.copy(options)
+        optionsPrefilter.prefilter = prefilter
+        timeStart = time.time()
+        candidates = list(CarveCandidates(data, codecs, optionsPrefilter))
+        streams = set((position, name, lenCompressed) for position, name, decompressed, lenCompressed in Carve(data, codecs, candidates, optionsPrefilter))
+        results[prefilter] = [len(candidates), streams, time.time() - timeStart]
+    countExhaustive, streamsExhaustive, timeExhaustive = results['none']
+    countPrefilter, streamsPrefilter, timePrefilter = results[options.prefilter]
+    oOutput.Line('Prefilter %s: candidates %d of %d (%.2f%%), reduction ratio %.2f' % (options.prefilter, countPrefilter, countExhaustive, IFF(countExhaustive == 0, 0.0, countPrefilter * 100.0 / max(countExhaustive, 1)), countExhaustive / max(countPrefilter, 1)))
+    oOutput.Line('Streams: exhaustive %d, prefiltered %d, missed %d' % (len(streamsExhaustive), len(streamsPrefilter), len(streamsExhaustive - streamsPrefilter)))
+    oOutput.Line('Time: exhaustive %.2fs, prefiltered %.2fs' % (timeExhaustive, timePrefilter))
 
 def ExtraInfoHEADASCII(data):
     if data == None:
@@ -1911,148 +2588,50 @@ def P23Ord(value):
     else:
         return ord(value)
 
-def ParseTokenSequence(data):
-    flags = P23Ord(data[0])
-    data = data[1:]
-    result = []
-    for mask in [0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80]:
-        if len(data) > 0:
-            if flags & mask:
-                result.append(data[0:2])
-                data = data[2:]
-            else:
-                result.append(data[0])
-                data = data[1:]
-    return result, data
-
-def OffsetBits(data):
-    numberOfBits = int(math.ceil(math.log(len(data), 2)))
-    if numberOfBits < 4:
-        numberOfBits = 4
-    elif numberOfBits > 12:
-        numberOfBits = 12
-    return numberOfBits
-
-def Bin(number):
-    result = bin(number)[2:]
-    while len(result) < 16:
-        result = '0' + result
-    return result
-
-def DecompressChunk(compressedChunk):
-    if len(compressedChunk) < 2:
-        return None, None
-    header = P23Ord(compressedChunk[0]) + P23Ord(compressedChunk[1]) * 0x100
-    size = (header & 0x0FFF) + 3
-    flagCompressed = header & 0x8000
-    data = compressedChunk[2:2 + size - 2]
-
-    if flagCompressed == 0:
-        return data.decode(errors='ignore'), compressedChunk[size:]
-
-    decompressedChunk = ''
-    while len(data) != 0:
-        tokens, data = ParseTokenSequence(data)
-        for token in tokens:
-            if type(token) == int:
-                decompressedChunk += chr(token)
-            elif len(token) == 1:
-                decompressedChunk += token
-            else:
-                if decompressedChunk == '':
-                    return None, None
-                numberOfOffsetBits = OffsetBits(decompressedChunk)
-                copyToken = P23Ord(token[0]) + P23Ord(token[1]) * 0x100
-                offset = 1 + (copyToken >> (16 - numberOfOffsetBits))
-                length = 3 + (((copyToken << numberOfOffsetBits) & 0xFFFF) >> numberOfOffsetBits)
-                copy = decompressedChunk[-offset:]
-                copy = copy[0:length]
-                lengthCopy = len(copy)
-                while length > lengthCopy: #a#
-                    if length - lengthCopy >= lengthCopy:
-                        copy += copy[0:lengthCopy]
-                        length -= lengthCopy
-                    else:
-                        copy += copy[0:length - lengthCopy]
-                        length -= length - lengthCopy
-                decompressedChunk += copy
-    return decompressedChunk, compressedChunk[size:]
-
-def Decompress(compressedData, replace=True):
-    if P23Ord(compressedData[0]) != 1:
-        return (False, None)
-    remainder = compressedData[1:]
-    decompressed = ''
-    while len(remainder) != 0:
-        decompressedChunk, remainder = DecompressChunk(remainder)
-        if decompressedChunk == None:
-            return (False, decompressed)
-        decompressed += decompressedChunk
-    if replace:
-        return (True, decompressed.replace('\r\n', '\n'))
-    else:
-        return (True, decompressed)
-
 def FindAllPotentialVBA(data, rules, options, oOutput):
-    potentials = []
     index = 1
     hashes = set()
-    positions = FindAll(data, b'\x01')
-    for position in positions:
-        buffer = data[position:position + 1]
-        positionChunk = position + 1
-        while True:
-            if positionChunk + 1 < len(data) and data[positionChunk + 1] & 0xF0 == 0xB0:
-                headerCompressedChunk = struct.unpack('<H', data[positionChunk:positionChunk+2])[0]
-                sizeCompressedChunk = (headerCompressedChunk & 0x0FFF) + 3
-                buffer += data[positionChunk:positionChunk+sizeCompressedChunk]
-                positionChunk += sizeCompressedChunk
-            else:
-                break
-
-        if buffer == b'\x01':
+    for position, chunks, end in VBAIndex(data):
+        decompressed = VBADecompress(data, chunks)
+        if decompressed == None:
             continue
-
-        try:
-            result, decompressed = Decompress(buffer.decode('latin'), False)
-            if result:
-                lenCompressed = len(buffer)
-                lenDecompressed = len(decompressed)
-                sha256 = hashlib.sha256(decompressed.encode('latin')).hexdigest()
-                if options.unique and sha256 in hashes:
-                    continue
-                hashes.add(sha256)
-                if lenDecompressed == 0:
-                   ratio = '    '
-                else:
-                   ratio = '%.2f' % (lenCompressed / lenDecompressed)
-                if options.yara != None:
-                    matches = rules.match(data=decompressed)
-                    if matches:
-                        oOutput.Line('%4d: 0x%08x %8d %8d %s %-16s %s' % (index, position, lenCompressed, lenDecompressed, ratio, binascii.b2a_hex(decompressed[:8].encode('latin')).decode('latin'), ExtraInfoHEADASCII(decompressed[:8].encode('latin'))))
-                    for result in matches:
-                        print('               YARA rule: %s' % result.rule)
-                        if options.yarastrings:
-                            for stringdata in result.strings:
-                                print('               %06x %s:' % (stringdata[0], stringdata[1]))
-                                print('                %s' % binascii.hexlify(C2BIP3(stringdata[2])))
-                                print('                %s' % repr(stringdata[2]))
-                elif options.select == '':
-                    oOutput.Line('%4d: 0x%08x %8d %8d %s %-16s %s' % (index, position, lenCompressed, lenDecompressed, ratio, binascii.b2a_hex(decompressed[:8].encode('latin')).decode('latin'), ExtraInfoHEADASCII(decompressed[:8].encode('latin'))))
-                else:
-                    if options.select.endswith('c'):
-                        selection = int(options.select[:-1])
-                        todump = buffer
-                    else:
-                        selection = int(options.select)
-                        todump = decompressed.encode('latin')
-                    if selection == index:
-                        DoDump(todump, options, oOutput)
-                index += 1
-        except:
-            raise
-
-def ProcessBinaryFile(filename, content, cutexpression, flag, rules, oOutput, oLogfile, options, oParserFlag):
+        lenCompressed = end - position
+        lenDecompressed = len(decompressed)
+        sha256 = hashlib.sha256(decompressed).hexdigest()
+        if options.unique and sha256 in hashes:
+            continue
+        hashes.add(sha256)
+        if lenDecompressed == 0:
+           ratio = '    '
+        else:
+           ratio = '%.2f' % (lenCompressed / lenDecompressed)
+        if options.yara != None:
+            matches = rules.match(data=decompressed)
+            if matches:
+                oOutput.Line('%4d: 0x%08x %8d %8d %s %-16s %s' % (index, position, lenCompressed, lenDecompressed, ratio, binascii.b2a_hex(decompressed[:8]).decode('latin'), ExtraInfoHEADASCII(decompressed[:8])))
+            for result in matches:
+                print('               YARA rule: %s' % result.rule)
+                if options.yarastrings:
+                    for stringdata in result.strings:
+                        print('               %06x %s:' % (stringdata[0], stringdata[1]))
+                        print('                %s' % binascii.hexlify(C2BIP3(stringdata[2])))
+                        print('                %s' % repr(stringdata[2]))
+        elif options.select == '':
+            oOutput.Line('%4d: 0x%08x %8d %8d %s %-16s %s' % (index, position, lenCompressed, lenDecompressed, ratio, binascii.b2a_hex(decompressed[:8]).decode('latin'), ExtraInfoHEADASCII(decompressed[:8])))
+        else:
+            if options.select.endswith('c'):
+                selection = int(options.select[:-1])
+                todump = data[position:end]
+            else:
+                selection = int(options.select)
+                todump = decompressed
+            if selection == index:
+                DoDump(todump, options, oOutput)
+        index += 1
+
+def ProcessBinaryFile(filename, content, cutexpression, flag, rules, oOutput, oLogfile, options, oParserFlag, oPool=None, oYARAPool=None, oCheckpoint=None):
+    parallel = False
+    oMmap = None
     if content == None:
         try:
             oBinaryFile = cBinaryFile(filename, C2BIP3(options.password), options.noextraction, options.literalfilenames)
@@ -2060,8 +2639,20 @@ def ProcessBinaryFile(filename, content, cutexpression, flag, rules, oOutput, oL
             oLogfile.LineError('Opening file %s %s' % (filename, repr(sys.exc_info()[1])))
             return
         oLogfile.Line('Success', 'Opening file %s' % filename)
+        # only regular files can be memory-mapped by the worker processes
+        parallel = oPool != None and cutexpression == '' and not oBinaryFile.extracted and oBinaryFile.fIn != sys.stdin and not isinstance(oBinaryFile.fIn, DataIO) and options.hints == '' and not (options.prefilter == 'header' and 'zlib' in [oCodec.name for oCodec in GetCodecs(options)])
+        if parallel:
+            # the main process memory-maps the file too, to merge the results of the worker processes without reading the file in memory
+            try:
+                oMmap = mmap.mmap(oBinaryFile.fIn.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, mmap.error):
+                # an empty file can not be memory-mapped
+                parallel = False
         try:
-            data = oBinaryFile.read()
+            if oMmap != None:
+                data = oMmap
+            else:
+                data = oBinaryFile.read()
         except:
             oLogfile.LineError('Reading file %s %s' % (filename, repr(sys.exc_info()[1])))
             return
@@ -2074,53 +2665,48 @@ def ProcessBinaryFile(filename, content, cutexpression, flag, rules, oOutput, oL
 
     try:
         # ----- Put your data processing code here -----
-        if not oOutput.binary and not options.jsonoutput:
+        # the output of a resumed file continues after the last stream reported before the checkpoint
+        if not oOutput.binary and not options.jsonoutput and not (oCheckpoint != None and oCheckpoint.resumed):
             oOutput.Line('File: %s%s' % (filename, IFF(oBinaryFile.extracted, ' (extracted)', '')))
-        buffer = data
-        
-        if options.type == 'zlib':
-            counter = 0
+
+        if options.type != 'vba':
             oMyJSONOutput = cMyJSONOutput()
-            hashes = set()
-            while len(buffer) > 0:
-                decompressed, lenCompressed, remainder = ZlibRawDecompress(buffer)
-                if decompressed == None or len(decompressed) < options.minsize:
-                    buffer = buffer[1:]
-                else:
-                    sha256 = hashlib.sha256(decompressed).hexdigest()
-                    if options.unique and sha256 in hashes:
-                        if options.deep == 0 or lenCompressed >= options.deep:
-                            buffer = remainder
-                        else:
-                            buffer = buffer[1:]
-                        continue
-                    hashes.add(sha256)
-                    counter += 1
-                    if options.jsonoutput:
-                        oMyJSONOutput.AddIdItem(counter, '0x%08x' % (len(data) - len(buffer)), decompressed)
-                    elif options.yara != None:
-                        matches = rules.match(data=decompressed)
-                        if matches:
-                            oOutput.Line('%d: 0x%08x %d %d %d' % (counter, len(data) - len(buffer), lenCompressed, len(decompressed), len(remainder)))
-                        for result in matches:
-                            print('               YARA rule: %s' % result.rule)
-                            if options.yarastrings:
-                                for stringdata in result.strings:
-                                    print('               %06x %s:' % (stringdata[0], stringdata[1]))
-                                    print('                %s' % binascii.hexlify(C2BIP3(stringdata[2])))
-                                    print('                %s' % repr(stringdata[2]))
-                    elif options.select == '':
-                        if len(decompressed) == 0:
-                           ratio = '    '
-                        else:
-                           ratio = '%.2f' % (lenCompressed / len(decompressed))
-                        oOutput.Line('%4d: 0x%08x %8d %8d %s %-16s %s' % (counter, len(data) - len(buffer), lenCompressed, len(decompressed), ratio, binascii.b2a_hex(decompressed[:8]).decode('latin'), ExtraInfoHEADASCII(decompressed[:8])))
-                    elif options.select == 'a' or int(options.select) == counter:
-                        DoDump(decompressed, options, oOutput)
-                    if options.deep == 0 or lenCompressed >= options.deep:
-                        buffer = remainder
+            codecs = GetCodecs(options)
+            if options.prefiltercompare:
+                PrefilterCompare(data, codecs, oOutput, options)
+                return
+            if parallel:
+                oCarve = CarveParallel(filename, data, codecs, oPool, options)
+            elif oCheckpoint != None:
+                oCarve = Carve(data, codecs, CarveCandidates(data, codecs, options, oCheckpoint.position), options, oCheckpoint)
+            else:
+                oCarve = CarveData(data, codecs, options)
+            oStreams = CarveRecursive(CarveSelect(oCarve, options, oCheckpoint), codecs, options)
+            # the codec column is only present when more than one codec is selected
+            if options.yara != None and not options.jsonoutput:
+                for (id, depth, position, name, lenCompressed, decompressed), matches in YARAMatchStreams(oStreams, rules, oYARAPool, options.yarajobs):
+                    if matches:
+                        oOutput.Line('%s%s: 0x%08x %s%d %d %d' % ('  ' * depth, id, position, IFF(len(codecs) > 1, '%-5s ' % name, ''), lenCompressed, len(decompressed), len(data) - position - lenCompressed))
+                    for result in matches:
+                        print('               YARA rule: %s' % result.rule)
+                        if options.yarastrings:
+                            for stringdata in result.strings:
+                                print('               %06x %s:' % (stringdata[0], stringdata[1]))
+                                print('                %s' % binascii.hexlify(C2BIP3(stringdata[2])))
+                                print('                %s' % repr(stringdata[2]))
+                oStreams = []
+            for id, depth, position, name, lenCompressed, decompressed in oStreams:
+                codecColumn = IFF(len(codecs) > 1, '%-5s ' % name, '')
+                if options.jsonoutput:
+                    oMyJSONOutput.AddIdItem(id, '0x%08x%s' % (position, IFF(len(codecs) > 1, ' ' + name, '')), decompressed)
+                elif options.select == '':
+                    if len(decompressed) == 0:
+                       ratio = '    '
                     else:
-                        buffer = buffer[1:]
+                       ratio = '%.2f' % (lenCompressed / len(decompressed))
+                    oOutput.Line('%s%4s: 0x%08x %s%8d %8d %s %-16s %s' % ('  ' * depth, id, position, codecColumn, lenCompressed, len(decompressed), ratio, binascii.b2a_hex(decompressed[:8]).decode('latin'), ExtraInfoHEADASCII(decompressed[:8])))
+                elif options.select == 'a' or options.select == str(id) or depth == 0 and options.select.isdigit() and int(options.select) == id:
+                    DoDump(decompressed, options, oOutput)
         if options.type == 'vba':
             FindAllPotentialVBA(data, rules, options, oOutput)
 
@@ -2131,22 +2717,181 @@ def ProcessBinaryFile(filename, content, cutexpression, flag, rules, oOutput, oL
         oLogfile.LineError('Processing file %s %s' % (filename, repr(sys.exc_info()[1])))
         if not options.ignoreprocessingerrors:
             raise
+    finally:
+        if oMmap != None:
+            CloseMmap(oMmap)
 
 #    data = CutData(cBinaryFile(filename, C2BIP3(options.password), options.noextraction, options.literalfilenames).Data(), cutexpression)[0]
 
-def RemoveFilesFromPriorRuns(filenames, filenamedatabase):
-    jsonfilename = 'filenamedatabase-%s.json' % filenamedatabase
-    if not os.path.exists(jsonfilename):
-        return filenames, {}
+def FileSHA256(filename):
+    oHash = hashlib.sha256()
+    with open(filename, 'rb') as fIn:
+        for block in iter(lambda: fIn.read(0x100000), b''):
+            oHash.update(block)
+    return oHash.hexdigest()
+
+# Database of processed files: an append-only log (one JSON record per line) that is loaded in a dictionary
+# A record is appended (and flushed) after each processed file, thus an interrupted run resumes with the first file that was not processed
+# A file was processed if a record exists with identical filename, size and modification time (and SHA256 with option --filenamedatabasehash)
+class cFilenameDatabase():
+    def __init__(self, name, hash=False):
+        self.logfilename = 'filenamedatabase-%s.log' % name
+        self.hash = hash
+        self.dRecords = {}
+        self.lastHash = None
+        countLines = 0
+        compact = False
+        terminated = True
+        if os.path.exists(self.logfilename):
+            with open(self.logfilename, 'r') as fLog:
+                for line in fLog:
+                    terminated = line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # incomplete record of an interrupted run
+                        continue
+                    self.dRecords[record['filename']] = record
+                    countLines += 1
+        else:
+            # import the JSON database of prior versions (filenames only)
+            jsonfilename = 'filenamedatabase-%s.json' % name
+            if os.path.exists(jsonfilename):
+                with open(jsonfilename, 'r') as fJSON:
+                    for filename, timestamp in json.load(fJSON).items():
+                        self.dRecords[filename] = {'filename': filename, 'size': None, 'mtime': None, 'time': timestamp}
+                compact = True
+        if compact or countLines > 2 * len(self.dRecords) + 1000:
+            self.Compact()
+        self.fLog = open(self.logfilename, 'a')
+        if not terminated:
+            self.fLog.write('\n')
+
+    def Compact(self):
+        with open(self.logfilename + '.tmp', 'w') as fLog:
+            for record in self.dRecords.values():
+                fLog.write(json.dumps(record) + '\n')
+        os.replace(self.logfilename + '.tmp', self.logfilename)
+
+    def Stat(self, filename):
+        try:
+            oStat = os.stat(filename)
+            return oStat.st_size, oStat.st_mtime
+        except OSError:
+            return None, None
 
-    dDatabase = json.load(open(jsonfilename, 'r'))
-    return [filename for filename in filenames if filename[0] not in dDatabase.keys()], dDatabase
+    def SHA256(self, filename):
+        if self.lastHash == None or self.lastHash[0] != filename:
+            try:
+                self.lastHash = [filename, FileSHA256(filename)]
+            except (IOError, OSError):
+                self.lastHash = [filename, None]
+        return self.lastHash[1]
+
+    def Processed(self, filename):
+        record = self.dRecords.get(filename, None)
+        if record == None:
+            return False
+        # records imported from a JSON database only have a filename
+        if record['size'] == None:
+            return True
+        if [record['size'], record['mtime']] != list(self.Stat(filename)):
+            return False
+        if self.hash:
+            return record.get('sha256', None) == self.SHA256(filename)
+        return True
+
+    def Add(self, filename):
+        size, mtime = self.Stat(filename)
+        record = {'filename': filename, 'size': size, 'mtime': mtime, 'time': time.time()}
+        if self.hash and size != None:
+            record['sha256'] = self.SHA256(filename)
+        self.dRecords[filename] = record
+        self.fLog.write(json.dumps(record) + '\n')
+        self.fLog.flush()
 
-def AddFilesToPriorRunsDatabase(dDatabase, filenamedatabase):
-    jsonfilename = 'filenamedatabase-%s.json' % filenamedatabase
-    json.dump(dDatabase, open(jsonfilename, 'w'))
+    def Close(self):
+        self.fLog.close()
+
+# Checkpoint for options --checkpoint and --resume: JSON side file with the files that were searched completely,
+# and for the file that is being searched: the position, the counter and the hashes (option -u) of the streams, and the length of the output file (option -o)
+# The side file is replaced atomically: a crash leaves the previous checkpoint or the new checkpoint
+class cCheckpoint():
+    def __init__(self, checkpointfilename, interval, options, oOutput):
+        self.checkpointfilename = checkpointfilename
+        self.interval = interval
+        self.unique = options.unique
+        self.oOutput = oOutput
+        self.signature = [options.type, options.prefilter, options.minsize, options.maxsize, options.deep, options.unique, options.recursive, options.select, options.output]
+        self.finished = []
+        self.filename = None
+        self.resumed = False
+        self.position = 0
+        self.positions = None
+        self.counter = 0
+        self.hashes = set()
+        self.timeSaved = time.time()
+
+    # Returns an error message or None
+    def Load(self):
+        if not os.path.exists(self.checkpointfilename):
+            return None
+        with open(self.checkpointfilename, 'r') as fCheckpoint:
+            state = json.load(fCheckpoint)
+        if state['signature'] != self.signature:
+            return 'the options differ from the options of the checkpoint'
+        self.finished = state['finished']
+        self.filename = state['filename']
+        self.resumed = self.filename != None
+        self.position = state['position']
+        self.positions = state.get('positions')
+        self.counter = state['counter']
+        self.hashes = set(state['hashes'])
+        self.oOutput.resumeLength = state['output']
+        return None
 
-def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag):
+    def Save(self):
+        if self.oOutput.fOut in [None, self.oOutput.STDOUT]:
+            sys.stdout.flush()
+            length = None
+        else:
+            self.oOutput.fOut.flush()
+            length = self.oOutput.fOut.tell()
+        state = {'signature': self.signature, 'finished': self.finished, 'filename': self.filename, 'position': self.position, 'positions': self.positions, 'counter': self.counter, 'hashes': IFF(self.unique, sorted(self.hashes), []), 'output': length}
+        with open(self.checkpointfilename + '.tmp', 'w') as fCheckpoint:
+            json.dump(state, fCheckpoint)
+        os.replace(self.checkpointfilename + '.tmp', self.checkpointfilename)
+        self.timeSaved = time.time()
+
+    def Finished(self, filename):
+        return filename in self.finished
+
+    def Start(self, filename):
+        if filename != self.filename:
+            self.filename = filename
+            self.resumed = False
+            self.position = 0
+            self.positions = None
+            self.counter = 0
+            self.hashes = set()
+
+    # All streams before this position have been reported, positions are the skip positions of the codecs (see CarveSkip)
+    def Progress(self, position, positions):
+        self.position = position
+        self.positions = positions
+        if time.time() - self.timeSaved >= self.interval:
+            self.Save()
+
+    def Stop(self, filename):
+        self.finished.append(filename)
+        self.Start(None)
+        self.Save()
+
+    def Remove(self):
+        if os.path.exists(self.checkpointfilename):
+            os.remove(self.checkpointfilename)
+
+def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag, oPool=None):
     rules = None
     if options.yara != None:
         if not 'yara' in sys.modules:
@@ -2154,34 +2899,59 @@ def ProcessBinaryFiles(filenames, oLogfile, options, oParserFlag):
             if sys.version >= '2.7.9':
                 print("You can use PIP to install yara-python like this: pip install yara-python\npip is located in Python's Scripts folder.\n")
             return returnCode
-        rules, rulesVerbose = YARACompile(options.yara)
+        rules, rulesVerbose = YARACompile(options.yara, options.yaracache)
         if options.verbose:
             print(rulesVerbose)
-
-    oOutput = InstantiateCOutput(options)
-    index = 0
-    if options.jsoninput:
-        items = CheckJSON(sys.stdin.read())
-        if items == None:
-            return
-        for item in items:
-            oOutput.Filename(item['name'], index, len(items))
-            index += 1
-            ProcessBinaryFile(item['name'], item['content'], '', '', rules, oOutput, oLogfile, options, oParserFlag)
-    else:
-        if options.filenamedatabase != '':
-            filenames, dDatabaseFilenames = RemoveFilesFromPriorRuns(filenames, options.filenamedatabase)
+    oYARAPool = None
+    if rules != None and options.yarajobs > 1:
+        oYARAPool = multiprocessing.pool.ThreadPool(options.yarajobs)
+    try:
+        oOutput = InstantiateCOutput(options)
+        index = 0
+        if options.jsoninput:
+            items = CheckJSON(sys.stdin.read())
+            if items == None:
+                return
+            for item in items:
+                oOutput.Filename(item['name'], index, len(items))
+                index += 1
+                ProcessBinaryFile(item['name'], item['content'], '', '', rules, oOutput, oLogfile, options, oParserFlag, None, oYARAPool)
         else:
-            dDatabaseFilenames = {}
-
-        for filename, cutexpression, flag in filenames:
-            oOutput.Filename(filename, index, len(filenames))
-            index += 1
-            dDatabaseFilenames[filename] = time.time()
-            ProcessBinaryFile(filename, None, cutexpression, flag, rules, oOutput, oLogfile, options, oParserFlag)
+            oFilenameDatabase = None
+            if options.filenamedatabase != '':
+                oFilenameDatabase = cFilenameDatabase(options.filenamedatabase, options.filenamedatabasehash)
+                filenames = [filename for filename in filenames if not oFilenameDatabase.Processed(filename[0])]
+
+            oCheckpoint = None
+            if options.checkpoint != '':
+                oCheckpoint = cCheckpoint(options.checkpoint, options.checkpointinterval, options, oOutput)
+                if options.resume:
+                    error = oCheckpoint.Load()
+                    if error != None:
+                        print('Error: checkpoint %s: %s' % (options.checkpoint, error))
+                        return
+                    filenames = [filename for filename in filenames if not oCheckpoint.Finished(filename[0])]
 
-        if options.filenamedatabase != '':
-            AddFilesToPriorRunsDatabase(dDatabaseFilenames, options.filenamedatabase)
+            try:
+                for filename, cutexpression, flag in filenames:
+                    oOutput.Filename(filename, index, len(filenames))
+                    index += 1
+                    if oCheckpoint != None:
+                        oCheckpoint.Start(filename)
+                    ProcessBinaryFile(filename, None, cutexpression, flag, rules, oOutput, oLogfile, options, oParserFlag, oPool, oYARAPool, oCheckpoint)
+                    if oCheckpoint != None:
+                        oCheckpoint.Stop(filename)
+                    if oFilenameDatabase != None:
+                        oFilenameDatabase.Add(filename)
+                if oCheckpoint != None:
+                    oCheckpoint.Remove()
+            finally:
+                if oFilenameDatabase != None:
+                    oFilenameDatabase.Close()
+    finally:
+        if oYARAPool != None:
+            oYARAPool.close()
+            oYARAPool.join()
 
 def Main():
     moredesc = '''
@@ -2195,14 +2965,25 @@ https://DidierStevens.com'''
 
     oParser = optparse.OptionParser(usage='usage: %prog [options] [[@]file|cut-expression|flag-expression ...]\n' + __description__ + moredesc, version='%prog ' + __version__, epilog='This tool also accepts flag arguments (#f#), read the man page (-m) for more info.')
     oParser.add_option('-m', '--man', action='store_true', default=False, help='Print manual')
-    oParser.add_option('-t', '--type', type=str, default='zlib', help='Type of compression')
+    oParser.add_option('-t', '--type', type=str, default='zlib', help='Type of compression: vba or a comma separated list of codecs (%s) or all (default zlib)' % ','.join(CodecNames()))
     oParser.add_option('-n', '--minsize', type=int, default=0, help='Minimum size of decompressed data (default 0)')
+    oParser.add_option('--maxsize', type=int, default=0, help='Maximum size of decompressed data per stream (default 0: no maximum)')
+    oParser.add_option('-P', '--prefilter', type=str, default='deflate', help='Prefilter for candidate positions: none, deflate (default) or header')
+    oParser.add_option('--prefiltercompare', action='store_true', default=False, help='Compare exhaustive search with prefiltered search')
+    oParser.add_option('--hints', type=str, default='', help='Use container format hints: first or only (default no hints)')
+    oParser.add_option('--checkpoint', type=str, default='', help='Side file to store checkpoints of the search')
+    oParser.add_option('--checkpointinterval', type=int, default=60, help='Seconds between checkpoints (default 60)')
+    oParser.add_option('--resume', action='store_true', default=False, help='Resume the search from the checkpoint')
+    oParser.add_option('--jobs', type=int, default=1, help='Number of processes to search a single file (default 1)')
     oParser.add_option('-u', '--unique', action='store_true', default=False, help='removed duplicates (decompressed data)')
+    oParser.add_option('-R', '--recursive', type=int, default=0, help='Search decompressed data recursively up to the given depth (default 0)')
     oParser.add_option('-D', '--deep', type=int, default=0, help='Deep scan (default 0)')
     oParser.add_option('-j', '--jsonoutput', action='store_true', default=False, help='produce json output')
     oParser.add_option('-V', '--verbose', action='store_true', default=False, help='verbose output with decoder errors and YARA rules')
     oParser.add_option('-y', '--yara', help="YARA rule-file, @file, directory or #rule to check streams (YARA search doesn't work with -s option)")
     oParser.add_option('--yarastrings', action='store_true', default=False, help='Print YARA strings')
+    oParser.add_option('--yaracache', type=str, default='', help='Directory to cache compiled YARA rules')
+    oParser.add_option('--yarajobs', type=int, default=1, help='Number of threads to match YARA rules (default 1)')
     oParser.add_option('-o', '--output', type=str, default='', help='Output to file (# supported)')
     oParser.add_option('-p', '--password', default='infected', help='The ZIP password to be used (default infected)')
     oParser.add_option('--noextraction', action='store_true', default=False, help='Do not extract from archive file')
@@ -2214,6 +2995,7 @@ https://DidierStevens.com'''
     oParser.add_option('--logcomment', type=str, default='', help='A string with comments to be included in the log file')
     oParser.add_option('--ignoreprocessingerrors', action='store_true', default=False, help='Ignore errors during file processing')
     oParser.add_option('--filenamedatabase', type=str, default='', help='Use this to skip files that have bene processed in prior runs')
+    oParser.add_option('--filenamedatabasehash', action='store_true', default=False, help='Also compare the SHA256 of files for option --filenamedatabase')
 
     oParser.add_option('-s', '--select', default='', help='select item nr for dumping')
     oParser.add_option('-d', '--dump', action='store_true', default=False, help='perform dump')
@@ -2232,6 +3014,29 @@ https://DidierStevens.com'''
         PrintManual()
         return
 
+    if options.type != 'vba' and options.type != 'all':
+        for name in options.type.split(','):
+            if not name in CodecNames():
+                print('Error: unknown type: %s' % name)
+                return
+    for oCodec in GetCodecs(options):
+        if options.type != 'vba' and oCodec.module != None and not oCodec.module in sys.modules:
+            print('Error: codec %s requires the %s Python module.' % (oCodec.name, oCodec.module))
+            return
+
+    if not options.prefilter in ['none', 'deflate', 'header']:
+        print('Error: unknown prefilter: %s' % options.prefilter)
+        return
+    if not options.hints in ['', 'first', 'only']:
+        print('Error: unknown hints mode: %s' % options.hints)
+        return
+    if options.resume and options.checkpoint == '':
+        print('Error: option --resume requires option --checkpoint')
+        return
+    if options.checkpoint != '' and (options.jobs > 1 or options.hints != '' or options.jsonoutput or options.jsoninput or options.yarajobs > 1):
+        print('Error: option --checkpoint can not be combined with options --jobs, --hints, --jsonoutput, --jsoninput and --yarajobs')
+        return
+
     if len(args) != 0 and options.jsoninput:
         print('Error: option -j can not be used with files')
         return
@@ -2245,7 +3050,15 @@ https://DidierStevens.com'''
         PrintError(oExpandFilenameArguments.message)
         oLogfile.Line('Warning', repr(oExpandFilenameArguments.message))
 
-    ProcessBinaryFiles(oExpandFilenameArguments.Filenames(), oLogfile, options, oParserFlag)
+    oPool = None
+    if options.jobs > 1:
+        oPool = multiprocessing.Pool(options.jobs)
+    try:
+        ProcessBinaryFiles(oExpandFilenameArguments.Filenames(), oLogfile, options, oParserFlag, oPool)
+    finally:
+        if oPool != None:
+            oPool.close()
+            oPool.join()
 
     if oLogfile.errors > 0:
         PrintError('Number of errors: %d' % oLogfile.errors)
@@ -4,8 +4,8 @@ from __future__ import print_function
 
 __description__ = 'Strings command in Python'
 __author__ = 'Didier Stevens'
-__version__ = '0.0.2'
-__date__ = '2018/07/21'
+__version__ = '0.0.3'
+__date__ = '2026/10/18'
 
 """
 Source code put in the public domain by Didier Stevens, no Copyright
@@ -22,6 +22,12 @@ History:
   2017/01/22: added option -p
   2017/01/28: added option -g
   2018/07/21: 0.0.2 refactoring with binary template; added option -c
+  2026/10/18: 0.0.3 added options -O, --stream and --chunksize
+  2026/10/18: single pass extraction of ASCII, UTF-16LE and UTF-16BE strings; added option -e
+  2026/10/18: indexed, memory-mapped goodware strings DB; added options --goodwaredb and --creategoodwaredb
+  2026/10/18: added option --jobs
+  2026/10/18: added option --sortmemory
+  2026/10/18: option -u uses fingerprints; added options --uniquebits and --uniqueverify
 
 Todo:
 """
@@ -44,6 +50,14 @@ import fnmatch
 import json
 import time
 import pickle
+import mmap
+import array
+import hashlib
+import multiprocessing
+import tempfile
+import shutil
+import itertools
+import heapq
 if sys.version_info[0] >= 3:
     from io import BytesIO as DataIO
 else:
@@ -65,6 +79,27 @@ This Python script was developed with Python 2.7 and tested with Python 2.7 and
 
 TBC
 
+ASCII, UTF-16LE and UTF-16BE strings are extracted in a single pass over the data, and reported in order of position inside the file.
+Option -t (--type) selects the type of strings: ascii, unicode (UTF-16LE and UTF-16BE) or all (default).
+When a sequence of bytes can be decoded both as UTF-16LE and UTF-16BE, the string that starts first is reported: this is the UTF-16BE string when the sequence starts with a NULL byte.
+With -t all, the same strings are reported as with -t ascii and -t unicode together (for a minimum length of 2 or more): an UTF-16LE string can start with the last character of an ASCII string, and an ASCII string can start with the last character of an UTF-16BE string.
+Option -O (--offset) prefixes each string with its position inside the file (hexadecimal), and option -e (--encoding) prefixes each string with its encoding (ascii, utf-16le or utf-16be).
+
+Option --stream is to be used with large files, like memory dumps of several GBs. Files are not read into memory completely: regular files are memory-mapped, and files extracted from ZIP or gzip files (and stdin) are read in chunks. Strings are extracted chunk by chunk (option --chunksize, default 16 MB). Strings that span 2 chunks are reported once.
+Option -u (--unique) removes repeated strings. The strings themselves are not kept in memory, only fingerprints (the first 64 bits of their MD5 hash, or 128 bits with option --uniquebits 128). It is very unlikely, but possible, that 2 different strings have the same fingerprint: then the second string is considered to be a repeat. Option --uniqueverify prevents this: strings are stored in a temporary file, and compared when their fingerprints are identical. With option --logfile, the number of unique strings and repeats (and with option --uniqueverify, fingerprint collisions) is written to the log file.
+
+Option -L (--length) sorts the strings of all files by length (shortest first). The strings are sorted in memory until the memory budget (option --sortmemory, default 512 MB) is exceeded, then they are written to temporary files (one per string length) that are read back when all files have been processed.
+
+Option --jobs can be used to extract strings from a single, large file with more than one process: it implies option --stream. The file is split in ranges (about --chunksize bytes large) that end with a byte that can not be part of a string, and these ranges are processed in parallel by the given number of processes. The results are identical to the results of a single process (same strings, same order), thus options like -u, -s, -l and -S behave identically. Only regular files (not extracted from ZIP or gzip files, not stdin) are processed in parallel.
+Option --stream is ignored for files with a cut-expression and when option -p is used.
+
+Option -g (--goodwarestrings) filters out strings that are found in the goodware strings DB. This is file good-strings.idx in the program directory, another file can be used with option --goodwaredb.
+The goodware strings DB is created with option --creategoodwaredb: all strings (selected with options -n, -t, -w and -r) extracted from the files provided as arguments are stored in the DB (use option --goodwaredb to choose the filename). Example:
+strings.py --stream --creategoodwaredb C:\Windows\System32\*.dll
+The DB contains 64-bit hashes of the strings (sorted, with a Bloom filter and an index) and is memory-mapped, so it can be used without loading it. Remark that different strings can have the same hash, but this is very unlikely.
+While creating the DB, the hashes are sorted within the memory budget of option --sortmemory: when it is exceeded, sorted hashes are written to temporary files that are merged at the end.
+When option --goodwaredb is not used and good-strings.idx is not found in the program directory, the old good-strings.db file (gzip compressed pickle) is used. A DB file provided with option --goodwaredb that is not found is an error.
+
 As stated at the beginning of this manual, this tool is very versatile when it comes to handling files. This will be explained now.
 
 This tool reads files in binary mode. It can read files from disk, from standard input (stdin) and from "generated" files via the command line.
@@ -239,6 +274,15 @@ QUOTE = '"'
 REGEX_STANDARD = '[\x09\x20-\x7E]'
 REGEX_WHITESPACE = '[\x09-\x0D\x20-\x7E]'
 FILENAME_GOODWAREDB = 'good-strings.db'
+FILENAME_GOODWAREDB_INDEX = 'good-strings.idx'
+GOODWAREDB_MAGIC = b'GSDB'
+GOODWAREDB_VERSION = 1
+GOODWAREDB_HEADER = '<4sIQIII'
+GOODWAREDB_BLOOM_HASHES = 4
+GOODWAREDB_BLOOM_BITS_PER_STRING = 16
+LENGTHSORTER_OVERHEAD = 100
+HASHSORTER_OVERHEAD = 100
+DEFAULT_CHUNKSIZE = 0x1000000
 
 def PrintError(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
@@ -1249,39 +1293,369 @@ def InstantiateCOutput(options):
         filenameOption = options.output
     return cOutput(filenameOption)
 
-def ExtractStringsASCII(data, options):
+def StringsCharacterRegex(options):
     if options.regex != '':
-        regex = options.regex + '{%d,}'
+        return options.regex
     elif options.whitespace:
-        regex = REGEX_WHITESPACE + '{%d,}'
+        return REGEX_WHITESPACE
     else:
-        regex = REGEX_STANDARD + '{%d,}'
-    return re.findall(C2BIP3(regex % options.bytes), data)
-
-def ExtractStringsUNICODE(data, options):
-    if options.regex != '':
-        regex = '((' + options.regex + '\x00){%d,})'
-    elif options.whitespace:
-        regex = '((' + REGEX_WHITESPACE + '\x00){%d,})'
-    else:
-        regex = '((' + REGEX_STANDARD + '\x00){%d,})'
-    return [foundunicodestring.replace(C2BIP3('\x00'), C2BIP3('')) for foundunicodestring, dummy in re.findall(C2BIP3(regex % options.bytes), data)]
+        return REGEX_STANDARD
+
+ENCODING_ASCII = 'ascii'
+ENCODING_UTF16LE = 'utf-16le'
+ENCODING_UTF16BE = 'utf-16be'
+
+# A single regex for all requested encodings, the data is scanned only once:
+#  an UTF-16BE string can not be followed by a NULL byte, otherwise it is an UTF-16LE string starting one byte later
+#  with type all, the search resumes at the last character of an ASCII string followed by a NULL byte (start of an UTF-16LE string) and at the last character of an UTF-16BE string (start of an ASCII string)
+# Fast path (method Extract): ASCII strings are searched with a plain regex, UTF-16 strings are only searched (anchored) at seeds
+#  a seed is a NULL byte followed by bytes - 1 characters each followed by a NULL byte: each UTF-16LE string contains a seed 1 byte after its start, each UTF-16BE string a seed at its start
+#  the seed regex starts with a literal, which the regex engine searches much faster than a character class
+#  with type all, the ASCII strings and the UTF-16 strings are merged: type all finds the union of types ascii and unicode (a minimum length of at least 2 and a NULL byte that is not a character)
+class cStringsExtractor():
+    def __init__(self, options):
+        character = StringsCharacterRegex(options)
+        regexASCII = '%s{%d,}' % (character, options.bytes)
+        regexUTF16BE = '(?P<utf16be>(?:\x00%s){%d,}(?!\x00))' % (character, options.bytes)
+        regexUnicode = '(?=\x00|%s)(?:(?P<utf16le>(?:%s\x00){%d,})|%s)' % (character, character, options.bytes, regexUTF16BE)
+        if options.type == 'ascii':
+            regex = regexASCII
+        elif options.type == 'unicode':
+            regex = regexUnicode
+        else:
+            regex = '(?=\x00|%s)(?:%s(?:(?P<utf16le>\x00(?:%s\x00){%d,})|%s{%d,})|%s)' % (character, character, character, options.bytes - 1, character, options.bytes - 1, regexUTF16BE)
+        self.oRegex = re.compile(C2BIP3(regex))
+        self.overlapping = options.type == 'all'
+        self.null = C2BIP3('\x00')
+        oCharacter = re.compile(C2BIP3(character))
+        self.oCharacter = oCharacter
+        self.oRegexASCII = None
+        if options.type != 'unicode':
+            self.oRegexASCII = re.compile(C2BIP3(regexASCII))
+        self.oRegexUnicode = None
+        if options.type != 'ascii':
+            self.oRegexUnicode = re.compile(C2BIP3(regexUnicode))
+            self.oRegexSeed = re.compile(C2BIP3('\x00(?=(?:%s\x00){%d})' % (character, options.bytes - 1)))
+        self.fast = not self.overlapping or options.bytes >= 2 and oCharacter.match(self.null) == None
+        # the offsets of the strings are only used by options -O and -L
+        self.offsets = options.offset or options.length
+        barrier = [re.escape(chr(byte)) for byte in range(1, 0x100) if oCharacter.match(C2BIP3(chr(byte))) == None]
+        # a byte that is not a NULL byte and not a character can not be part of a string
+        if barrier == []:
+            self.oBarrier = None
+        else:
+            self.oBarrier = re.compile(C2BIP3('[%s]' % ''.join(barrier)))
+        # matches ending in the last overlap bytes of a chunk can change when more data is available
+        self.overlap = 2 * options.bytes + 2
+
+    # position where the search continues after oMatch
+    def Resume(self, data, oMatch, endposition):
+        position = oMatch.end()
+        if self.overlapping and position < endposition and (oMatch.lastgroup == 'utf16be' or oMatch.lastgroup == None and data[position:position + 1] == self.null):
+            return position - 1
+        return position
+
+    def Finditer(self, data, position=0, endposition=None):
+        if endposition == None:
+            endposition = len(data)
+        if self.oRegexASCII == None:
+            return self.FinditerUnicode(data, position, endposition)
+        if not self.overlapping:
+            return self.oRegex.finditer(data, position, endposition)
+        return self.FinditerOverlapping(data, position, endposition)
+
+    # Same matches as self.oRegexUnicode.finditer: each match starts at a seed or 1 byte before a seed
+    def FinditerUnicode(self, data, position=0, endposition=None):
+        if endposition == None:
+            endposition = len(data)
+        positionSeed = position
+        while True:
+            oSeed = self.oRegexSeed.search(data, positionSeed, endposition)
+            if oSeed == None:
+                return
+            positionSeed = oSeed.start() + 1
+            for start in [oSeed.start() - 1, oSeed.start()]:
+                if start >= position:
+                    oMatch = self.oRegexUnicode.match(data, start, endposition)
+                    if oMatch != None:
+                        yield oMatch
+                        position = oMatch.end()
+                        positionSeed = position
+                        break
+
+    # Returns the list of (offset, encoding, string) tuples from position to endposition, in order of offset
+    def Extract(self, data, position=0, endposition=None):
+        if endposition == None:
+            endposition = len(data)
+        if not self.fast:
+            return [(oMatch.start(), ) + self.Decode(oMatch) for oMatch in self.Finditer(data, position, endposition)]
+        offsetStrings = []
+        if self.oRegexUnicode == None and not self.offsets:
+            # findall does not create match objects
+            return list(zip(itertools.repeat(None), itertools.repeat(ENCODING_ASCII), self.oRegexASCII.findall(data, position, endposition)))
+        if self.oRegexASCII != None:
+            offsetStrings = [(oMatch.start(), ENCODING_ASCII, oMatch.group()) for oMatch in self.oRegexASCII.finditer(data, position, endposition)]
+        if self.oRegexUnicode != None:
+            offsetStringsUnicode = [(oMatch.start(), ) + self.DecodeBytes(oMatch.lastgroup, oMatch.group()) for oMatch in self.FinditerUnicode(data, position, endposition)]
+            if offsetStrings == []:
+                offsetStrings = offsetStringsUnicode
+            elif offsetStringsUnicode != []:
+                # no ASCII string and UTF-16 string start at the same offset
+                offsetStrings = sorted(offsetStrings + offsetStringsUnicode)
+        return offsetStrings
+
+    def FinditerOverlapping(self, data, position, endposition):
+        while True:
+            oMatch = self.oRegex.search(data, position, endposition)
+            if oMatch == None:
+                return
+            yield oMatch
+            position = self.Resume(data, oMatch, endposition)
+
+    # 0 for a NULL byte, 1 for a character, 2 for other bytes
+    def ByteClass(self, data, position):
+        byte = data[position:position + 1]
+        if byte == self.null:
+            return 0
+        elif self.oCharacter.match(byte) != None:
+            return 1
+        else:
+            return 2
+
+    # True when the search from position finds the same string as oMatch (found searching from resume), shifted by position - resume
+    def Continues(self, data, oMatch, resume, position):
+        oMatchContinued = self.oRegex.search(data, position)
+        return oMatchContinued != None and oMatchContinued.start() - position == oMatch.start() - resume and oMatchContinued.end() == oMatch.end() and oMatchContinued.lastgroup == oMatch.lastgroup
+
+    def DecodeBytes(self, lastgroup, data):
+        if lastgroup == 'utf16le':
+            return ENCODING_UTF16LE, data[::2]
+        elif lastgroup == 'utf16be':
+            return ENCODING_UTF16BE, data[1::2]
+        else:
+            return ENCODING_ASCII, data
+
+    def Decode(self, oMatch):
+        return self.DecodeBytes(oMatch.lastgroup, oMatch.group())
+
+# Scans a sequence of chunks and yields (offset, encoding, string) tuples in order of offset
+# The end of a chunk that can contain (part of) a string, is carried over and scanned again with the next chunk, so that strings crossing chunk boundaries are found once and intact
+# A string that continues past the end of a chunk is not scanned again from its start: the bytes before the carried over tail are kept (pending) until the string ends, so long strings cost linear time
+def ExtractStringsChunks(chunks, oStringsExtractor):
+    overlap = oStringsExtractor.overlap
+    tail = C2BIP3('')
+    tailOffset = 0
+    pendingOffset = None
+    pendingParts = []
+    for chunk in itertools.chain(chunks, [None]):
+        if chunk == None:
+            buffer = tail
+            limit = len(buffer)
+        else:
+            buffer = tail + chunk
+            limit = len(buffer) - overlap
+        previous = 0
+        resume = None
+        for oMatch in oStringsExtractor.Finditer(buffer):
+            end = oMatch.end()
+            if end > limit:
+                # an UTF-16BE string can start one byte before an UTF-16LE string that is not yet terminated
+                resume = max(previous, oMatch.start() - 1)
+                # an even number of bytes is skipped, so that the search continues with the same string
+                # the byte before the string is only relevant when it fits the pattern of the string (for example, a NULL byte before an UTF-16LE string)
+                base = resume
+                if pendingOffset == None and oStringsExtractor.ByteClass(buffer, resume) != oStringsExtractor.ByteClass(buffer, resume + 2):
+                    base = oMatch.start()
+                position = base + 2 * ((len(buffer) - 2 * overlap - base) // 2)
+                if position > base and oStringsExtractor.Continues(buffer, oMatch, base, position):
+                    if pendingOffset == None:
+                        pendingOffset = tailOffset + base
+                    pendingParts.append(buffer[base:position])
+                    resume = position
+                break
+            if pendingOffset == None:
+                yield (tailOffset + oMatch.start(), ) + oStringsExtractor.Decode(oMatch)
+            else:
+                yield (pendingOffset + oMatch.start(), ) + oStringsExtractor.DecodeBytes(oMatch.lastgroup, (C2BIP3('').join(pendingParts) + buffer[:end])[oMatch.start():])
+                pendingOffset = None
+                pendingParts = []
+            previous = oStringsExtractor.Resume(buffer, oMatch, len(buffer))
+        if resume == None:
+            resume = max(previous, limit - overlap, 0)
+        tail = buffer[resume:]
+        tailOffset += resume
 
 def ExtractStrings(data, options):
-    if options.type == 'all':
-        return ExtractStringsASCII(data, options) + ExtractStringsUNICODE(data, options)
-    elif options.type == 'ascii':
-        return ExtractStringsASCII(data, options)
-    elif options.type == 'unicode':
-        return ExtractStringsUNICODE(data, options)
+    return cStringsExtractor(options).Extract(data)
+
+# Memory-maps regular files (not extracted from zip/gz, not stdin, not generated), returns None for other files
+def MmapBinaryFile(oBinaryFile):
+    if oBinaryFile.extracted or oBinaryFile.fIn == sys.stdin:
+        return None
+    # generated files (DataIO) have no file descriptor
+    try:
+        if os.fstat(oBinaryFile.fIn.fileno()).st_size > 0:
+            return mmap.mmap(oBinaryFile.fIn.fileno(), 0, access=mmap.ACCESS_READ)
+    except:
+        pass
+    return None
+
+# Regular files are memory-mapped, other files (extracted from zip/gz, stdin, ...) are read in chunks
+def ReadChunks(oBinaryFile, chunksize):
+    oMmap = MmapBinaryFile(oBinaryFile)
+    if oMmap != None:
+        try:
+            for position in range(0, len(oMmap), chunksize):
+                yield oMmap[position:position + chunksize]
+        finally:
+            oMmap.close()
     else:
-        print('Unknown type option: %s' % options.type)
-        return []
+        while True:
+            chunk = oBinaryFile.read(chunksize)
+            if len(chunk) == 0:
+                break
+            yield chunk
+
+# Splits the file in ranges of about rangesize bytes, that end with a byte that can not be part of a string
+# Strings never cross range boundaries, thus each range can be scanned independently with the same result as a scan of the complete file
+def SplitRanges(oMmap, rangesize, oStringsExtractor):
+    ranges = []
+    start = 0
+    while start < len(oMmap):
+        end = start + rangesize
+        if oStringsExtractor.oBarrier == None or end >= len(oMmap):
+            end = len(oMmap)
+        else:
+            oMatch = oStringsExtractor.oBarrier.search(oMmap, end)
+            if oMatch == None:
+                end = len(oMmap)
+            else:
+                end = oMatch.end()
+        ranges.append([start, end])
+        start = end
+    return ranges
+
+dMmapsWorker = {}
+
+# Executed by the worker processes: each worker memory-maps the file once
+def ExtractStringsRange(arguments):
+    filename, start, end, options = arguments
+    if not filename in dMmapsWorker:
+        for oMmap in dMmapsWorker.values():
+            oMmap.close()
+        dMmapsWorker.clear()
+        with open(filename, 'rb') as fIn:
+            dMmapsWorker[filename] = mmap.mmap(fIn.fileno(), 0, access=mmap.ACCESS_READ)
+    return cStringsExtractor(options).Extract(dMmapsWorker[filename], start, end)
+
+# Ranges are extracted by the process pool and the results are yielded in order of offset
+# The number of ranges that are being processed is limited, to limit memory usage
+def ExtractStringsParallel(filename, oMmap, oPool, options):
+    try:
+        ranges = SplitRanges(oMmap, options.chunksize, cStringsExtractor(options))
+    finally:
+        oMmap.close()
+    queue = collections.deque()
+    for start, end in ranges:
+        queue.append(oPool.apply_async(ExtractStringsRange, [[filename, start, end, options]]))
+        if len(queue) >= 2 * options.jobs:
+            for offsetString in queue.popleft().get():
+                yield offsetString
+    while len(queue) > 0:
+        for offsetString in queue.popleft().get():
+            yield offsetString
+
+def ExtractStringsStream(oBinaryFile, options, oPool=None):
+    if oPool != None:
+        oMmap = MmapBinaryFile(oBinaryFile)
+        if oMmap != None:
+            return ExtractStringsParallel(oBinaryFile.filename, oMmap, oPool, options)
+    return ExtractStringsChunks(ReadChunks(oBinaryFile, options.chunksize), cStringsExtractor(options))
 
 def ConsecutiveLettersLength(data):
     return max([0] + [len(letters) for letters in re.findall(C2BIP3(r'[a-z]+'), data, re.I)])
 
-def StringsSub(extractedString, oOutput, dUnique, oExtraSensical, options):
+# Set of strings that only stores fingerprints (64 or 128 bits of the MD5 hash) in an open addressing hash table backed by arrays
+# The arrays contain 32-bit words (typecode I, 64-bit typecode Q does not exist in Python 2): one array per word of the fingerprint
+# With verify, the strings are stored in a temporary file and compared when the fingerprints match, making the set exact: the position in the file is stored in 2 extra arrays
+class cFingerprintSet():
+    def __init__(self, bits=64, verify=False):
+        if not bits in [64, 128]:
+            raise Exception('Fingerprint size must be 64 or 128 bits: %d' % bits)
+        self.words = bits // 32
+        self.verify = verify
+        self.count = 0
+        self.duplicates = 0
+        self.collisions = 0
+        self.fStore = None
+        if self.verify:
+            self.fStore = tempfile.TemporaryFile()
+        self.Allocate(0x10000)
+
+    def Allocate(self, capacity):
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.tables = [array.array('I', [0]) * capacity for iter in range(self.words + IFF(self.verify, 2, 0))]
+
+    def Fingerprint(self, data):
+        fingerprint = struct.unpack('<4I', hashlib.md5(data).digest())[:self.words]
+        if fingerprint[0] == 0:
+            fingerprint = (1, ) + fingerprint[1:]
+        return fingerprint
+
+    def Read(self, index):
+        self.fStore.seek(self.tables[self.words][index] + (self.tables[self.words + 1][index] << 32))
+        length = struct.unpack('<I', self.fStore.read(4))[0]
+        return self.fStore.read(length)
+
+    def Insert(self, index, values):
+        for table, value in zip(self.tables, values):
+            table[index] = value
+
+    def Grow(self):
+        tables = self.tables
+        self.Allocate(self.capacity * 2)
+        for index in range(len(tables[0])):
+            if tables[0][index] != 0:
+                values = [table[index] for table in tables]
+                indexNew = values[0] & self.mask
+                while self.tables[0][indexNew] != 0:
+                    indexNew = (indexNew + 1) & self.mask
+                self.Insert(indexNew, values)
+
+    # Returns True if data was added before, False otherwise
+    def Add(self, data):
+        fingerprint = self.Fingerprint(data)
+        index = fingerprint[0] & self.mask
+        while self.tables[0][index] != 0:
+            if all(self.tables[word][index] == fingerprint[word] for word in range(self.words)):
+                if not self.verify or self.Read(index) == data:
+                    self.duplicates += 1
+                    return True
+                self.collisions += 1
+            index = (index + 1) & self.mask
+        values = fingerprint
+        if self.verify:
+            self.fStore.seek(0, os.SEEK_END)
+            position = self.fStore.tell()
+            self.fStore.write(struct.pack('<I', len(data)) + data)
+            values += (position & 0xFFFFFFFF, position >> 32)
+        self.Insert(index, values)
+        self.count += 1
+        if self.count * 2 > self.capacity:
+            self.Grow()
+        return False
+
+    def Memory(self):
+        return self.capacity * 4 * len(self.tables)
+
+    def Close(self):
+        if self.fStore != None:
+            self.fStore.close()
+            self.fStore = None
+
+def StringsSub(offsetString, oOutput, oUnique, oExtraSensical, options):
+    offset, encoding, extractedString = offsetString
     if options.casesensitive:
         Case = lambda x: x
     else:
@@ -1293,9 +1667,16 @@ def StringsSub(extractedString, oOutput, dUnique, oExtraSensical, options):
         if options.letters:
             doPrint = doPrint and ConsecutiveLettersLength(extractedString) >= options.letters
         if options.unique:
-            doPrint = doPrint and not extractedString in dUnique
-            dUnique[extractedString] = True
+            seen = oUnique.Add(extractedString)
+            doPrint = doPrint and not seen
         if doPrint and not options.invert or not doPrint and options.invert:
+            if options.offset or options.encoding:
+                prefix = ''
+                if options.offset:
+                    prefix += '%08x ' % offset
+                if options.encoding:
+                    prefix += '%-8s ' % encoding
+                extractedString = C2BIP3(prefix) + extractedString
             if options.whitespace:
                 StdoutWriteChunked(extractedString)
             else:
@@ -1304,32 +1685,212 @@ def StringsSub(extractedString, oOutput, dUnique, oExtraSensical, options):
 def Filter(extractedStrings, imported):
     if imported == [] or imported == None:
         return extractedStrings
-    return [extractedString for extractedString in extractedStrings if not extractedString in imported]
+    return (offsetString for offsetString in extractedStrings if not offsetString[2] in imported)
+
+def GoodwareHash(extractedString):
+    return struct.unpack('<Q', hashlib.md5(extractedString).digest()[:8])[0]
+
+# Goodware strings DB: header, Bloom filter, bucket index and sorted 64-bit hashes of the strings
+# The Bloom filter rejects most strings that are not in the DB, the others are looked up in their (small) bucket
+# All integers are little-endian, the file is memory-mapped
+class cGoodwareStrings():
+    def __init__(self, filename):
+        self.fDB = open(filename, 'rb')
+        self.oMmap = mmap.mmap(self.fDB.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, bloomBitsLog, self.bloomHashes, bucketsLog = struct.unpack_from(GOODWAREDB_HEADER, self.oMmap, 0)
+        if magic != GOODWAREDB_MAGIC or version != GOODWAREDB_VERSION:
+            raise Exception('Not a goodware strings DB file: %s' % filename)
+        self.bloomMask = (1 << bloomBitsLog) - 1
+        self.bucketsShift = 64 - bucketsLog
+        self.positionBloom = struct.calcsize(GOODWAREDB_HEADER)
+        self.positionBuckets = self.positionBloom + (1 << bloomBitsLog) // 8
+        self.positionHashes = self.positionBuckets + ((1 << bucketsLog) + 1) * 8
+
+    def __contains__(self, extractedString):
+        hash = GoodwareHash(extractedString)
+        for bit in GoodwareBloomBits(hash, self.bloomHashes, self.bloomMask):
+            if C2IIP2(self.oMmap[self.positionBloom + (bit >> 3)]) & (1 << (bit & 7)) == 0:
+                return False
+        low, high = struct.unpack_from('<QQ', self.oMmap, self.positionBuckets + (hash >> self.bucketsShift) * 8)
+        while low < high:
+            middle = (low + high) // 2
+            value = struct.unpack_from('<Q', self.oMmap, self.positionHashes + middle * 8)[0]
+            if value == hash:
+                return True
+            elif value < hash:
+                low = middle + 1
+            else:
+                high = middle
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def Close(self):
+        self.oMmap.close()
+        self.fDB.close()
+
+def GoodwareBloomBits(hash, bloomHashes, bloomMask):
+    hash1 = hash & 0xFFFFFFFF
+    hash2 = (hash >> 32) | 1
+    return [(hash1 + iter * hash2) & bloomMask for iter in range(bloomHashes)]
+
+# os.replace is not available in Python 2
+def ReplaceFile(source, destination):
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+    else:
+        if sys.platform == 'win32' and os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+def WriteIntegers64(fOut, integers):
+    for position in range(0, len(integers), 0x10000):
+        batch = integers[position:position + 0x10000]
+        fOut.write(struct.pack('<%dQ' % len(batch), *batch))
+
+def ReadIntegers64(filename):
+    with open(filename, 'rb') as fIn:
+        while True:
+            data = fIn.read(8 * 0x10000)
+            if len(data) == 0:
+                break
+            for integer in struct.unpack('<%dQ' % (len(data) // 8), data):
+                yield integer
+
+# Sorts and deduplicates hashes within a memory budget: when the budget is exceeded, the sorted hashes are written to a temporary file, and all temporary files are merged at the end
+class cHashSorter():
+    def __init__(self, budget):
+        self.budget = budget
+        self.hashes = set()
+        self.spillFilenames = []
+        self.directory = None
+
+    def Add(self, hash):
+        self.hashes.add(hash)
+        if len(self.hashes) * HASHSORTER_OVERHEAD > self.budget:
+            self.Spill()
+
+    def Spill(self):
+        if self.directory == None:
+            self.directory = tempfile.mkdtemp(prefix='strings-')
+        filename = os.path.join(self.directory, '%d.bin' % len(self.spillFilenames))
+        with open(filename, 'wb') as fSpill:
+            WriteIntegers64(fSpill, sorted(self.hashes))
+        self.spillFilenames.append(filename)
+        self.hashes = set()
+
+    # writes the sorted, unique hashes to a temporary file, returns the number of hashes and the filename
+    def WriteSorted(self):
+        self.Spill()
+        filename = os.path.join(self.directory, 'sorted.bin')
+        count = 0
+        previous = None
+        with open(filename, 'wb') as fSorted:
+            batch = []
+            for hash in heapq.merge(*[ReadIntegers64(spillFilename) for spillFilename in self.spillFilenames]):
+                if hash != previous:
+                    batch.append(hash)
+                    previous = hash
+                    if len(batch) == 0x10000:
+                        WriteIntegers64(fSorted, batch)
+                        count += len(batch)
+                        batch = []
+            WriteIntegers64(fSorted, batch)
+            count += len(batch)
+        return count, filename
+
+    def Close(self):
+        if self.directory != None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+def WriteGoodwareStrings(filename, oHashSorter):
+    count, filenameHashes = oHashSorter.WriteSorted()
+    bloomBitsLog = max(13, (count * GOODWAREDB_BLOOM_BITS_PER_STRING).bit_length())
+    bloomMask = (1 << bloomBitsLog) - 1
+    bucketsLog = max(8, min(24, count.bit_length() - 3))
+    bucketsShift = 64 - bucketsLog
+
+    bloom = bytearray((1 << bloomBitsLog) // 8)
+    buckets = [0] * ((1 << bucketsLog) + 1)
+    for hash in ReadIntegers64(filenameHashes):
+        for bit in GoodwareBloomBits(hash, GOODWAREDB_BLOOM_HASHES, bloomMask):
+            bloom[bit >> 3] |= 1 << (bit & 7)
+        buckets[(hash >> bucketsShift) + 1] += 1
+    for index in range(1, len(buckets)):
+        buckets[index] += buckets[index - 1]
+
+    with open(filename + '.tmp', 'wb') as fDB:
+        fDB.write(struct.pack(GOODWAREDB_HEADER, GOODWAREDB_MAGIC, GOODWAREDB_VERSION, count, bloomBitsLog, GOODWAREDB_BLOOM_HASHES, bucketsLog))
+        fDB.write(bloom)
+        WriteIntegers64(fDB, buckets)
+        with open(filenameHashes, 'rb') as fHashes:
+            shutil.copyfileobj(fHashes, fDB)
+    ReplaceFile(filename + '.tmp', filename)
+    return count
+
+def GoodwareStringsFilename(options):
+    if options.goodwaredb != '':
+        return options.goodwaredb
+    return os.path.join(os.path.dirname(sys.argv[0]), FILENAME_GOODWAREDB_INDEX)
+
+def LoadGoodwareStrings(options):
+    filename = GoodwareStringsFilename(options)
+    if os.path.exists(filename):
+        try:
+            return cGoodwareStrings(filename)
+        except:
+            print('Error opening goodware strings DB file: %s %s' % (filename, repr(sys.exc_info()[1])))
+            return None
+    elif options.goodwaredb != '':
+        print('Error goodware strings DB file not found: %s' % filename)
+        return None
 
-def LoadGoodwareStrings():
     filename = os.path.join(os.path.dirname(sys.argv[0]), FILENAME_GOODWAREDB)
     try:
         fDB = gzip.GzipFile(filename, 'rb')
     except:
         print('Error opening goodware strings DB file: %s' % filename)
         return None
-    collection = pickle.loads(fDB.read())
+    collection = set(pickle.loads(fDB.read()))
     fDB.close()
     return collection
 
-def ProcessBinaryFile(filename, content, cutexpression, goodware, oLogfile, options):
+def ProcessBinaryFileStream(filename, goodware, oLogfile, options, oPool):
+    try:
+        oBinaryFile = cBinaryFile(filename, C2BIP3(options.password), options.noextraction, options.literalfilenames)
+    except:
+        oLogfile.LineError('Opening file %s %s' % (filename, repr(sys.exc_info()[1])))
+        return
+    oLogfile.Line('Success', 'Opening file %s' % filename)
+
+    try:
+        for offsetString in Filter(ExtractStringsStream(oBinaryFile, options, oPool), goodware):
+            yield offsetString
+    except:
+        oLogfile.LineError('Processing file %s %s' % (filename, repr(sys.exc_info()[1])))
+        if not options.ignoreprocessingerrors:
+            raise
+    finally:
+        oBinaryFile.close()
+
+def ProcessBinaryFile(filename, content, cutexpression, goodware, oLogfile, options, oPool=None):
+    if (options.stream or oPool != None) and content == None and cutexpression == '' and not options.pefile:
+        return ProcessBinaryFileStream(filename, goodware, oLogfile, options, oPool)
+
     if content == None:
         try:
             oBinaryFile = cBinaryFile(filename, C2BIP3(options.password), options.noextraction, options.literalfilenames)
         except:
             oLogfile.LineError('Opening file %s %s' % (filename, repr(sys.exc_info()[1])))
-            return
+            return []
         oLogfile.Line('Success', 'Opening file %s' % filename)
         try:
             data = oBinaryFile.read()
         except:
             oLogfile.LineError('Reading file %s %s' % (filename, repr(sys.exc_info()[1])))
-            return
+            return []
         data = CutData(data, cutexpression)
         oBinaryFile.close()
     else:
@@ -1356,8 +1917,88 @@ def ProcessBinaryFile(filename, content, cutexpression, goodware, oLogfile, opti
         oLogfile.LineError('Processing file %s %s' % (filename, repr(sys.exc_info()[1])))
         if not options.ignoreprocessingerrors:
             raise
+    return []
+
+ENCODINGS = [ENCODING_ASCII, ENCODING_UTF16LE, ENCODING_UTF16BE]
+
+# Sorts strings by length (stable sort) with a memory budget: strings are kept in buckets per length, and when the budget is exceeded, the buckets are appended to spill files (one per length)
+class cLengthSorter():
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.dBuckets = {}
+        self.spilledLengths = set()
+        self.directory = None
+
+    def Add(self, offsetString):
+        length = len(offsetString[2])
+        if not length in self.dBuckets:
+            self.dBuckets[length] = []
+        self.dBuckets[length].append(offsetString)
+        self.used += length + LENGTHSORTER_OVERHEAD
+        if self.used > self.budget:
+            self.Spill()
+
+    def Extend(self, offsetStrings):
+        for offsetString in offsetStrings:
+            self.Add(offsetString)
+
+    def SpillFilename(self, length):
+        return os.path.join(self.directory, '%d.bin' % length)
+
+    def Spill(self):
+        if self.directory == None:
+            self.directory = tempfile.mkdtemp(prefix='strings-')
+        for length, bucket in self.dBuckets.items():
+            with open(self.SpillFilename(length), 'ab') as fSpill:
+                for offset, encoding, extractedString in bucket:
+                    fSpill.write(struct.pack('<QB', offset, ENCODINGS.index(encoding)) + extractedString)
+            self.spilledLengths.add(length)
+        self.dBuckets = {}
+        self.used = 0
+
+    def Sorted(self):
+        for length in sorted(self.spilledLengths | set(self.dBuckets.keys())):
+            if length in self.spilledLengths:
+                recordSize = struct.calcsize('<QB') + length
+                with open(self.SpillFilename(length), 'rb') as fSpill:
+                    while True:
+                        records = fSpill.read(recordSize * 0x1000)
+                        if len(records) == 0:
+                            break
+                        for position in range(0, len(records), recordSize):
+                            offset, encoding = struct.unpack('<QB', records[position:position + 9])
+                            yield offset, ENCODINGS[encoding], records[position + 9:position + recordSize]
+            for offsetString in self.dBuckets.get(length, []):
+                yield offsetString
 
-def ProcessBinaryFiles(filenames, oLogfile, options):
+    def Close(self):
+        if self.directory != None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+def CreateGoodwareStrings(filenames, oLogfile, options, oPool):
+    oHashSorter = cHashSorter(options.sortmemory * 1024 * 1024)
+    try:
+        if options.jsoninput:
+            items = CheckJSON(sys.stdin.read())
+            if items == None:
+                return
+            for item in items:
+                for offsetString in ProcessBinaryFile(item['name'], item['content'], '', None, oLogfile, options):
+                    oHashSorter.Add(GoodwareHash(offsetString[2]))
+        else:
+            for filename, cutexpression in filenames:
+                for offsetString in ProcessBinaryFile(filename, None, cutexpression, None, oLogfile, options, oPool):
+                    oHashSorter.Add(GoodwareHash(offsetString[2]))
+        filename = GoodwareStringsFilename(options)
+        count = WriteGoodwareStrings(filename, oHashSorter)
+    finally:
+        oHashSorter.Close()
+    oLogfile.Line('GoodwareDB', filename, str(count))
+    print('Goodware strings DB %s created with %d unique strings' % (filename, count))
+
+def ProcessBinaryFiles(filenames, oLogfile, options, oPool):
     oOutput = InstantiateCOutput(options)
     index = 0
 
@@ -1367,13 +2008,15 @@ def ProcessBinaryFiles(filenames, oLogfile, options):
         oExtraSensical = reextra.cExtraSensical(True)
     if options.whitespace:
         IfWIN32SetBinary(sys.stdout)
-    dUnique = {}
+    oUnique = None
+    if options.unique:
+        oUnique = cFingerprintSet(options.uniquebits, options.uniqueverify)
 
     goodware = None
     if options.goodwarestrings:
-        goodware = LoadGoodwareStrings()
+        goodware = LoadGoodwareStrings(options)
 
-    selectedStrings = []
+    oLengthSorter = cLengthSorter(options.sortmemory * 1024 * 1024)
     if options.jsoninput:
         items = CheckJSON(sys.stdin.read())
         if items == None:
@@ -1383,25 +2026,36 @@ def ProcessBinaryFiles(filenames, oLogfile, options):
             index += 1
             result = ProcessBinaryFile(item['name'], item['content'], '', goodware, oLogfile, options)
             if options.length:
-                selectedStrings.extend(result)
+                oLengthSorter.Extend(result)
             else:
-                for extractedString in result:
-                    StringsSub(extractedString, oOutput, dUnique, oExtraSensical, options)
+                for offsetString in result:
+                    StringsSub(offsetString, oOutput, oUnique, oExtraSensical, options)
     else:
         for filename, cutexpression in filenames:
             oOutput.Filename(filename, index, len(filenames))
             index += 1
-            result = ProcessBinaryFile(filename, None, cutexpression, goodware, oLogfile, options)
+            result = ProcessBinaryFile(filename, None, cutexpression, goodware, oLogfile, options, oPool)
             if options.length:
-                selectedStrings.extend(result)
+                oLengthSorter.Extend(result)
             else:
-                for extractedString in result:
-                    StringsSub(extractedString, oOutput, dUnique, oExtraSensical, options)
+                for offsetString in result:
+                    StringsSub(offsetString, oOutput, oUnique, oExtraSensical, options)
 
     if options.length:
-        selectedStrings = sorted(selectedStrings, key=len)
-        for extractedString in selectedStrings:
-            StringsSub(extractedString, oOutput, dUnique, oExtraSensical, options)
+        try:
+            for offsetString in oLengthSorter.Sorted():
+                StringsSub(offsetString, oOutput, oUnique, oExtraSensical, options)
+        finally:
+            oLengthSorter.Close()
+
+    if options.unique:
+        counters = ['strings %d' % oUnique.count, 'duplicates %d' % oUnique.duplicates]
+        # collisions are only detected with option --uniqueverify
+        if options.uniqueverify:
+            counters.append('collisions %d' % oUnique.collisions)
+        counters.append('memory %d' % oUnique.Memory())
+        oLogfile.Line('Unique', *counters)
+        oUnique.Close()
 
 def Main():
     moredesc = '''
@@ -1421,11 +2075,21 @@ https://DidierStevens.com'''
     oParser.add_option('-S', '--sensical', action='store_true', default=False, help='Output only sensical strings (e.g. no gibberish)')
     oParser.add_option('-v', '--invert', action='store_true', default=False, help='Invert selection (does not apply to -s)')
     oParser.add_option('-u', '--unique', action='store_true', default=False, help='Remove repeated strings')
+    oParser.add_option('--uniquebits', type=int, default=64, help='Size of the fingerprints for option -u: 64 (default) or 128 bits')
+    oParser.add_option('--uniqueverify', action='store_true', default=False, help='Verify strings with identical fingerprints for option -u')
     oParser.add_option('-L', '--length', action='store_true', default=False, help='Sort by string length')
-    oParser.add_option('-t', '--type', default='all', help='Type of strings ascii, unicode or all (default)')
+    oParser.add_option('--sortmemory', type=int, default=512, help='Memory budget in MB for sorting with option -L (default 512)')
+    oParser.add_option('-t', '--type', default='all', help='Type of strings ascii, unicode (UTF-16LE and UTF-16BE) or all (default)')
     oParser.add_option('-r', '--regex', default='', help='Regex to be used to match characters')
     oParser.add_option('-p', '--pefile', action='store_true', default=False, help='Parse file as PE file and remove imported symbols')
     oParser.add_option('-g', '--goodwarestrings', action='store_true', default=False, help='Use the goodware strings db to filter out strings')
+    oParser.add_option('--goodwaredb', type=str, default='', help='Goodware strings DB file to use or create (default %s in the program directory)' % FILENAME_GOODWAREDB_INDEX)
+    oParser.add_option('--creategoodwaredb', action='store_true', default=False, help='Create the goodware strings DB with the strings of the provided files')
+    oParser.add_option('-O', '--offset', action='store_true', default=False, help='Prefix each string with its position (hexadecimal)')
+    oParser.add_option('-e', '--encoding', action='store_true', default=False, help='Prefix each string with its encoding (ascii, utf-16le or utf-16be)')
+    oParser.add_option('--stream', action='store_true', default=False, help='Memory-mapped, chunked extraction for large files')
+    oParser.add_option('--jobs', type=int, default=1, help='Number of processes to extract strings from a single file (default 1)')
+    oParser.add_option('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='Chunk size for option --stream (default %d)' % DEFAULT_CHUNKSIZE)
     oParser.add_option('--password', default='infected', help='The ZIP password to be used (default infected)')
     oParser.add_option('--noextraction', action='store_true', default=False, help='Do not extract from archive file')
     oParser.add_option('--literalfilenames', action='store_true', default=False, help='Do not interpret filenames')
@@ -1442,6 +2106,10 @@ https://DidierStevens.com'''
         PrintManual()
         return
 
+    if not options.type in ['all', 'ascii', 'unicode']:
+        print('Unknown type option: %s' % options.type)
+        return
+
     if len(args) != 0 and options.jsoninput:
         print('Error: option -j can not be used with files')
         return
@@ -1455,7 +2123,18 @@ https://DidierStevens.com'''
         PrintError(oExpandFilenameArguments.message)
         oLogfile.Line('Warning', repr(oExpandFilenameArguments.message))
 
-    ProcessBinaryFiles(oExpandFilenameArguments.Filenames(), oLogfile, options)
+    oPool = None
+    if options.jobs > 1:
+        oPool = multiprocessing.Pool(options.jobs)
+    try:
+        if options.creategoodwaredb:
+            CreateGoodwareStrings(oExpandFilenameArguments.Filenames(), oLogfile, options, oPool)
+        else:
+            ProcessBinaryFiles(oExpandFilenameArguments.Filenames(), oLogfile, options, oPool)
+    finally:
+        if oPool != None:
+            oPool.close()
+            oPool.join()
 
     if oLogfile.errors > 0:
         PrintError('Number of errors: %d' % oLogfile.errors)
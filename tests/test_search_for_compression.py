@@ -0,0 +1,96 @@
+import bz2
+import gzip
+import importlib.util
+import lzma
+import optparse
+import os
+import random
+import struct
+import sys
+import zlib
+
+import pytest
+
+FILENAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'search-for-compression.py')
+
+
+@pytest.fixture(scope='module')
+def sfc():
+    spec = importlib.util.spec_from_file_location('search_for_compression', FILENAME)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def StoredBlock(payload):
+    return b'\x01' + len(payload).to_bytes(2, 'little') + (len(payload) ^ 0xFFFF).to_bytes(2, 'little') + payload
+
+
+@pytest.mark.parametrize('position', [0, 1, 0xFFFE, 0xFFFF])
+def test_deflate_stored_last_position(sfc, position):
+    data = b'\x55' * position + StoredBlock(b'ABCD') + b'\x55' * 0x100
+    assert list(sfc.DeflateStoredCandidates(data, 0, position + 1)) == [position]
+    assert list(sfc.DeflateStoredCandidates(data, 0, position)) == []
+    assert list(sfc.DeflateStoredCandidates(data, position, 0x10000)) == [position]
+
+
+def test_deflate_stored_block_boundaries(sfc, monkeypatch):
+    monkeypatch.setattr(sfc, 'DEFLATE_STORED_BLOCK', 4)
+    data = b'\x55' * 3 + StoredBlock(b'') + StoredBlock(b'') + b'\x55' * 3
+    assert list(sfc.DeflateStoredCandidates(data, 0, len(data))) == [3, 8]
+
+
+def test_deflate_stored_end_of_data(sfc):
+    data = b'\x55' * 10 + StoredBlock(b'')
+    assert list(sfc.DeflateStoredCandidates(data, 0, len(data))) == [10]
+
+
+def Options(type):
+    return optparse.Values({'type': type, 'prefilter': 'deflate', 'minsize': 0, 'maxsize': 0, 'deep': 0})
+
+
+def Streams(sfc, data, type):
+    options = Options(type)
+    codecs = sfc.GetCodecs(options)
+    return [(position, name, lenCompressed) for position, name, decompressed, lenCompressed in sfc.Carve(data, codecs, sfc.CarveCandidates(data, codecs, options), options)]
+
+
+def LZNT1Stream(payload):
+    # literals for the first 3 bytes, followed by a copy token (offset 3) for the rest of the periodic payload
+    chunk = b'\x08' + payload[:3] + struct.pack('<H', (2 << 12) | (len(payload) - 6))
+    return struct.pack('<H', 0xB000 | (len(chunk) - 1)) + chunk + b'\x00\x00'
+
+
+def MixedData():
+    oRandom = random.Random(1)
+    text = b' '.join(oRandom.choice([b'alpha', b'beta', b'gamma', b'delta']) for _ in range(300))
+    oCompressobj = zlib.compressobj(9, zlib.DEFLATED, -15)
+    compressors = [gzip.compress, lzma.compress, lambda data: lzma.compress(data, format=lzma.FORMAT_ALONE), bz2.compress, lambda data: oCompressobj.copy().compress(data) + oCompressobj.copy().flush(), lambda data: LZNT1Stream(b'abc' * 100)]
+    data = b''
+    for index in range(60):
+        data += bytes(oRandom.randrange(256) for _ in range(oRandom.randrange(100, 2000)))
+        data += compressors[index % len(compressors)](text[:oRandom.randrange(100, len(text))])
+    return data
+
+
+def test_all_codecs_same_streams_as_each_codec(sfc):
+    data = MixedData()
+    streamsAll = Streams(sfc, data, 'all')
+    magic = [(position, position + lenCompressed) for position, name, lenCompressed in streamsAll if name in ['gzip', 'xz', 'lzma', 'bzip2']]
+    for name in ['gzip', 'xz', 'lzma', 'bzip2', 'zlib', 'lznt1']:
+        streams = Streams(sfc, data, name)
+        assert len(streams) >= 10
+        # streams of a weak codec inside a stream of a codec with a magic signature (e.g. deflate inside gzip) are not reported with -t all
+        expected = [stream for stream in streams if name in ['gzip', 'xz', 'lzma', 'bzip2'] or not any(start <= stream[0] < end for start, end in magic)]
+        assert [stream for stream in streamsAll if stream[1] == name] == expected
+
+
+def test_lznt1_requires_compressed_chunk(sfc):
+    stream = LZNT1Stream(b'abc' * 100)
+    decompressed, lenCompressed = sfc.LZNT1Decompress(memoryview(stream), 0, 0)
+    assert decompressed == b'abc' * 100 and lenCompressed == len(stream)
+    uncompressed = b'\xFF\x3F' + b'A' * 0x1000 + b'\x00\x00'
+    assert sfc.LZNT1Decompress(memoryview(uncompressed), 0, 0) == (None, None)
+    # a compressed chunk with only literals decompresses to fewer bytes than its size
+    literals = b'\x06\xB0\x00ABCDEF' + b'\x00\x00'
+    assert sfc.LZNT1Decompress(memoryview(literals), 0, 0) == (None, None)